@@ -0,0 +1,294 @@
+"""Двухуровневый read-through кэш.
+
+Первый уровень — LRU в памяти процесса (TTL и ограничение размера), второй —
+необязательный общий кэш (Redis) для нескольких воркеров. Одновременные промахи по
+одному ключу объединяются: загрузку выполняет один поток, остальные ждут результат.
+Инвалидация увеличивает поколение ключа, поэтому загрузка, начатая до нее, не
+положит в кэш устаревшее значение. Ошибки общего уровня логируются, и кэш продолжает
+работать только с локальным уровнем; чтобы зависший Redis давал ошибку, а не блокировал
+поток, у клиента короткие таймауты, а ожидание объединенной загрузки ограничено.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Protocol, TypeVar
+
+FEATURE_CACHE_SIZE = int(os.getenv("FEATURE_CACHE_SIZE", "10000"))
+FEATURE_CACHE_TTL = float(os.getenv("FEATURE_CACHE_TTL", "30"))
+FEATURE_CACHE_REDIS_URL = os.getenv("FEATURE_CACHE_REDIS_URL", "")
+# Таймауты соединения и операций Redis (с); по умолчанию redis-py ждет бесконечно
+FEATURE_CACHE_REDIS_TIMEOUT = float(os.getenv("FEATURE_CACHE_REDIS_TIMEOUT", "0.1"))
+FEATURE_CACHE_REDIS_CONNECT_TIMEOUT = float(os.getenv("FEATURE_CACHE_REDIS_CONNECT_TIMEOUT", "0.5"))
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class LRUCache:
+    """LRU с TTL; потокобезопасен"""
+
+    def __init__(
+        self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        if maxsize < 1 or ttl <= 0:
+            raise ValueError("maxsize and ttl must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any:
+        """Значение или _MISSING"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires = entry
+            if expires <= self._clock():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, self._clock() + self.ttl)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SharedCache(Protocol):
+    """Общий уровень кэша: байты по строковому ключу"""
+
+    def get(self, key: str) -> Optional[bytes]: ...
+
+    def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+
+class RedisCache:
+    """Общий уровень поверх клиента redis-py (или совместимого по get/set/delete)"""
+
+    def __init__(self, client: Any, prefix: str = "cache:") -> None:
+        self._client = client
+        self._prefix = prefix
+
+    @classmethod
+    def from_url(
+        cls,
+        url: str,
+        prefix: str = "cache:",
+        timeout: float = FEATURE_CACHE_REDIS_TIMEOUT,
+        connect_timeout: float = FEATURE_CACHE_REDIS_CONNECT_TIMEOUT,
+    ) -> "RedisCache":
+        try:
+            import redis  # необязательная зависимость
+        except ImportError as exc:
+            raise RuntimeError("FEATURE_CACHE_REDIS_URL is set but redis is not installed") from exc
+        client = redis.Redis.from_url(
+            url, socket_timeout=timeout, socket_connect_timeout=connect_timeout
+        )
+        return cls(client, prefix)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self._prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._client.set(self._prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._prefix + key)
+
+
+class _Call:
+    """Загрузка, которую ждут объединенные запросы"""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class ReadThroughCache(Generic[V]):
+    """Кэш перед функцией загрузки; None от загрузчика (нет объекта) не кэшируется"""
+
+    def __init__(
+        self,
+        loader: Callable[[Any], Optional[V]],
+        local: LRUCache,
+        shared: Optional[SharedCache] = None,
+        encode: Optional[Callable[[V], bytes]] = None,
+        decode: Optional[Callable[[bytes], V]] = None,
+        namespace: str = "",
+        wait_timeout: float = 1.0,
+    ) -> None:
+        if shared is not None and (encode is None or decode is None):
+            raise ValueError("shared cache requires encode and decode")
+        self._loader = loader
+        self.local = local
+        self.shared = shared
+        self._encode = encode
+        self._decode = decode
+        self._namespace = namespace
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._inflight: Dict[Any, _Call] = {}
+        self._generations: Dict[Any, int] = {}
+        self._epoch = 0  # увеличивается при clear()
+        self._stats = {
+            "local_hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "shared_errors": 0,
+            "wait_timeouts": 0,
+        }
+
+    def set_shared(self, shared: Optional[SharedCache]) -> None:
+        """Подключить или отключить общий уровень"""
+        if shared is not None and (self._encode is None or self._decode is None):
+            raise ValueError("shared cache requires encode and decode")
+        self.shared = shared
+
+    def _shared_key(self, key: Any) -> str:
+        return f"{self._namespace}{key}"
+
+    def get(self, key: Any) -> Optional[V]:
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self._count("local_hits")
+            return value
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                generation = self._generation(key)
+            else:
+                self._stats["coalesced"] += 1
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                # Загрузка лидера зависла — читаем источник сами, в кэш не кладем
+                self._count("wait_timeouts")
+                return self._loader(key)
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = self._fetch(key, generation)
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+        return call.value
+
+    def _generation(self, key: Any) -> tuple:
+        return self._epoch, self._generations.get(key, 0)
+
+    def _shared_call(self, operation: str, *args: Any) -> Any:
+        """Вызов общего уровня; при ошибке — None (как промах), кэш работает локально"""
+        shared = self.shared
+        if shared is None:
+            return None
+        try:
+            return getattr(shared, operation)(*args)
+        except Exception as exc:  # сеть, таймаут, сериализация — не повод отвечать 500
+            self._count("shared_errors")
+            logger.warning("shared cache %s failed: %s", operation, exc.__class__.__name__)
+            return None
+
+    def _fetch(self, key: Any, generation: tuple) -> Optional[V]:
+        data = self._shared_call("get", self._shared_key(key))
+        if data is not None:
+            try:
+                value = self._decode(data)
+            except Exception:
+                self._count("shared_errors")
+                logger.warning("shared cache returned undecodable value")
+            else:
+                self._count("shared_hits")
+                self._store_local(key, value, generation)
+                return value
+
+        self._count("misses")
+        value = self._loader(key)
+        if value is None:
+            return None
+        if self._store_local(key, value, generation) and self.shared is not None:
+            shared_key = self._shared_key(key)
+            self._shared_call("set", shared_key, self._encode(value), self.local.ttl)
+            with self._lock:
+                stale = self._generation(key) != generation
+            if stale:
+                # Инвалидация успела пройти между записью в LRU и в общий кэш
+                self._shared_call("delete", shared_key)
+        return value
+
+    def _store_local(self, key: Any, value: V, generation: tuple) -> bool:
+        """Кладет значение, только если ключ не инвалидировали во время загрузки"""
+        with self._lock:
+            if self._generation(key) != generation:
+                return False
+            self.local.set(key, value)
+            return True
+
+    def invalidate(self, key: Any) -> None:
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self.local.delete(key)
+        self._shared_call("delete", self._shared_key(key))
+
+    def clear(self) -> None:
+        """Очищает локальный уровень (общий истекает по TTL)"""
+        with self._lock:
+            self._epoch += 1
+            self._generations.clear()
+            self.local.clear()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов и доли от всех обращений"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        lookups = sum(stats[name] for name in ("local_hits", "shared_hits", "misses", "coalesced"))
+        hits = lookups - stats["misses"]
+        stats["lookups"] = lookups
+        stats["hit_ratio"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["miss_ratio"] = round(stats["misses"] / lookups, 4) if lookups else 0.0
+        stats["local_size"] = len(self.local)
+        return stats
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for name in self._stats:
+                self._stats[name] = 0
@@ -0,0 +1,256 @@
+"""Возобновляемая загрузка файлов по частям (chunked upload).
+
+Состояние сессии хранится на диске компактно:
+- ``<id>.json`` — метаданные (имя, размер, размер чанка, владелец, время создания);
+- ``<id>.part`` — предвыделенный файл, чанки пишутся по смещению ``index * chunk_size``;
+- ``<id>.map`` — битовая карта полученных чанков (1 бит на чанк).
+
+Сессия истекает, если ``UPLOAD_SESSION_IDLE_TTL`` секунд не получала чанков (время
+изменения ``.map``); просроченные сессии удаляются при создании новых. Открытых сессий
+не больше ``UPLOAD_MAX_SESSIONS_PER_CLIENT`` на клиента и ``UPLOAD_MAX_SESSIONS`` всего.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .file_upload import ALLOWED_EXTENSIONS, MAX_FILE_SIZE, UPLOAD_DIR
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1 MB
+MIN_CHUNK_SIZE = 1024  # 1 KB
+SESSIONS_DIR = UPLOAD_DIR / ".sessions"
+UPLOAD_SESSION_IDLE_TTL = float(os.getenv("UPLOAD_SESSION_IDLE_TTL", "3600"))
+UPLOAD_MAX_SESSIONS_PER_CLIENT = int(os.getenv("UPLOAD_MAX_SESSIONS_PER_CLIENT", "4"))
+UPLOAD_MAX_SESSIONS = int(os.getenv("UPLOAD_MAX_SESSIONS", "200"))
+
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+# Битовая карта обновляется read-modify-write, поэтому сериализуем запись
+_bitmap_lock = threading.Lock()
+# Подсчет открытых сессий и создание новой выполняются атомарно
+_sessions_lock = threading.Lock()
+
+
+class UploadSessionError(Exception):
+    """Ошибка работы с сессией загрузки (код ошибки + HTTP статус)"""
+
+    def __init__(self, code: str, message: str, status: int = 422):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status = status
+
+
+def _session_paths(upload_id: str) -> Tuple[Path, Path, Path]:
+    """Пути к файлам сессии; upload_id проверяется, чтобы исключить path traversal"""
+    if not _UPLOAD_ID_RE.match(upload_id):
+        raise UploadSessionError("not_found", "upload session not found", status=404)
+    base = SESSIONS_DIR / upload_id
+    return base.with_suffix(".json"), base.with_suffix(".part"), base.with_suffix(".map")
+
+
+def _last_activity(paths: List[Path]) -> Optional[float]:
+    """Время последнего изменения файлов сессии (чанк обновляет .part и .map)"""
+    times = []
+    for path in paths:
+        try:
+            times.append(path.stat().st_mtime)
+        except FileNotFoundError:
+            continue
+    return max(times) if times else None
+
+
+def _is_expired(last_activity: float, now: float) -> bool:
+    return now - last_activity >= UPLOAD_SESSION_IDLE_TTL
+
+
+def _load_meta(upload_id: str) -> dict:
+    paths = _session_paths(upload_id)
+    try:
+        meta = json.loads(paths[0].read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        raise UploadSessionError("not_found", "upload session not found", status=404)
+    last_activity = _last_activity(list(paths)) or 0.0
+    if _is_expired(last_activity, time.time()):
+        delete_session(upload_id)
+        raise UploadSessionError("not_found", "upload session not found", status=404)
+    meta["expires_at"] = last_activity + UPLOAD_SESSION_IDLE_TTL
+    return meta
+
+
+def _sweep(now: float) -> Counter:
+    """Удаляет простаивающие сессии; возвращает число открытых по владельцам.
+
+    Файлы без метаданных (сбой посреди создания) удаляются по тому же правилу.
+    """
+    owners: Counter = Counter()
+    if not SESSIONS_DIR.is_dir():
+        return owners
+    sessions: Dict[str, List[Path]] = {}
+    for path in SESSIONS_DIR.iterdir():
+        sessions.setdefault(path.stem, []).append(path)
+    for upload_id, paths in sessions.items():
+        last_activity = _last_activity(paths)
+        if last_activity is None:  # сессию удалили параллельно
+            continue
+        if _is_expired(last_activity, now):
+            for path in paths:
+                path.unlink(missing_ok=True)
+            continue
+        try:
+            meta = json.loads((SESSIONS_DIR / f"{upload_id}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        owners[meta.get("owner", "")] += 1
+    return owners
+
+
+def sweep_expired(now: Optional[float] = None) -> int:
+    """Удаляет простаивающие сессии и возвращает число открытых"""
+    return sum(_sweep(time.time() if now is None else now).values())
+
+
+def _total_chunks(size: int, chunk_size: int) -> int:
+    return (size + chunk_size - 1) // chunk_size
+
+
+def create_session(
+    filename: str, size: int, chunk_size: int = DEFAULT_CHUNK_SIZE, owner: str = ""
+) -> dict:
+    """Создает сессию загрузки клиента owner; лимиты размера и расширения проверяются заранее"""
+    if size <= 0:
+        raise UploadSessionError("validation_error", "File is empty")
+    if size > MAX_FILE_SIZE:
+        raise UploadSessionError(
+            "validation_error", f"File size exceeds limit of {MAX_FILE_SIZE} bytes"
+        )
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_FILE_SIZE:
+        raise UploadSessionError(
+            "validation_error",
+            f"chunk_size must be {MIN_CHUNK_SIZE}..{MAX_FILE_SIZE} bytes",
+        )
+    file_ext = Path(filename).suffix.lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise UploadSessionError("validation_error", f"File extension {file_ext} is not allowed")
+
+    SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    meta_path, part_path, map_path = _session_paths(upload_id)
+    total = _total_chunks(size, chunk_size)
+    created_at = time.time()
+
+    with _sessions_lock:
+        # Каждая сессия держит на диске предвыделенный .part до MAX_FILE_SIZE
+        owners = _sweep(created_at)
+        if owners[owner] >= UPLOAD_MAX_SESSIONS_PER_CLIENT:
+            raise UploadSessionError(
+                "rate_limited", "too many open upload sessions for this client", status=429
+            )
+        if sum(owners.values()) >= UPLOAD_MAX_SESSIONS:
+            raise UploadSessionError(
+                "service_unavailable", "too many open upload sessions", status=503
+            )
+        with open(part_path, "wb") as f:
+            f.truncate(size)
+        map_path.write_bytes(bytes((total + 7) // 8))
+        meta = {
+            "filename": filename,
+            "size": size,
+            "chunk_size": chunk_size,
+            "owner": owner,
+            "created_at": created_at,
+        }
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+    return {
+        "upload_id": upload_id,
+        "chunk_size": chunk_size,
+        "total_chunks": total,
+        "expires_at": created_at + UPLOAD_SESSION_IDLE_TTL,
+    }
+
+
+def expected_chunk_length(upload_id: str, index: int) -> int:
+    """Ожидаемая длина чанка (последний может быть короче)"""
+    meta = _load_meta(upload_id)
+    size, chunk_size = meta["size"], meta["chunk_size"]
+    total = _total_chunks(size, chunk_size)
+    if not 0 <= index < total:
+        raise UploadSessionError("validation_error", f"chunk index must be 0..{total - 1}")
+    return min(chunk_size, size - index * chunk_size)
+
+
+def write_chunk(upload_id: str, index: int, data: bytes) -> None:
+    """Записывает чанк по смещению; повторная запись того же чанка идемпотентна"""
+    expected = expected_chunk_length(upload_id, index)
+    if len(data) != expected:
+        raise UploadSessionError(
+            "validation_error", f"chunk {index} must be exactly {expected} bytes"
+        )
+    meta = _load_meta(upload_id)
+    _, part_path, map_path = _session_paths(upload_id)
+
+    try:
+        fd = os.open(part_path, os.O_WRONLY)
+    except FileNotFoundError:  # сессия истекла и удалена между проверкой и записью
+        raise UploadSessionError("not_found", "upload session not found", status=404)
+    try:
+        os.pwrite(fd, data, index * meta["chunk_size"])
+    finally:
+        os.close(fd)
+
+    with _bitmap_lock:
+        bitmap = bytearray(map_path.read_bytes())
+        bitmap[index >> 3] |= 1 << (index & 7)
+        map_path.write_bytes(bytes(bitmap))
+
+
+def _received_flags(upload_id: str) -> List[bool]:
+    meta = _load_meta(upload_id)
+    _, _, map_path = _session_paths(upload_id)
+    bitmap = map_path.read_bytes()
+    total = _total_chunks(meta["size"], meta["chunk_size"])
+    return [bool(bitmap[i >> 3] & (1 << (i & 7))) for i in range(total)]
+
+
+def get_status(upload_id: str) -> dict:
+    """Статус сессии: полученные диапазоны чанков в виде [[start, end], ...] включительно"""
+    meta = _load_meta(upload_id)
+    flags = _received_flags(upload_id)
+    ranges: List[List[int]] = []
+    for i, received in enumerate(flags):
+        if not received:
+            continue
+        if ranges and ranges[-1][1] == i - 1:
+            ranges[-1][1] = i
+        else:
+            ranges.append([i, i])
+    return {
+        "upload_id": upload_id,
+        "filename": meta["filename"],
+        "size": meta["size"],
+        "chunk_size": meta["chunk_size"],
+        "total_chunks": len(flags),
+        "received_ranges": ranges,
+        "complete": all(flags),
+        "expires_at": meta["expires_at"],
+    }
+
+
+def assemble(upload_id: str) -> Tuple[bytes, str]:
+    """Возвращает собранное содержимое и исходное имя файла, если все чанки получены"""
+    meta = _load_meta(upload_id)
+    if not all(_received_flags(upload_id)):
+        raise UploadSessionError("conflict", "upload is incomplete", status=409)
+    _, part_path, _ = _session_paths(upload_id)
+    return part_path.read_bytes(), meta["filename"]
+
+
+def delete_session(upload_id: str) -> None:
+    """Удаляет файлы сессии"""
+    for path in _session_paths(upload_id):
+        path.unlink(missing_ok=True)
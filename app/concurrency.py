@@ -0,0 +1,152 @@
+"""Адаптивное ограничение одновременных запросов и сброс нагрузки (NFR-04).
+
+Для каждого класса маршрутов (загрузки, массовый импорт, остальное) держится лимит
+запросов «в работе». Лимит подстраивается по AIMD: пока задержка ниже целевой и лимит
+используется, он растет на ``1/limit`` за каждый завершенный запрос (≈ +1 за «окно»);
+когда задержка превышает цель — умножается на ``backoff``, не чаще раза за период цели.
+Запросы сверх лимита сразу получают 503, не занимая пул потоков.
+
+Методы вызываются из event loop, поэтому блокировки не нужны.
+"""
+
+import math
+import os
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+CONCURRENCY_TARGET_LATENCY_MS = float(os.getenv("CONCURRENCY_TARGET_LATENCY_MS", "250"))
+
+
+class AdaptiveLimit:
+    __slots__ = (
+        "name",
+        "initial",
+        "min_limit",
+        "max_limit",
+        "target_latency",
+        "backoff",
+        "_clock",
+        "_limit",
+        "_in_flight",
+        "_last_decrease",
+        "_latency_ema",
+        "completed",
+        "shed",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        target_latency: Optional[float] = None,
+        backoff: float = 0.9,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError("limits must satisfy 1 <= min <= initial <= max")
+        if target_latency is None:
+            target_latency = CONCURRENCY_TARGET_LATENCY_MS / 1000
+        self.name = name
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self._clock = clock
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._last_decrease = -math.inf
+        self._latency_ema = 0.0
+        self.completed = 0
+        self.shed = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def try_acquire(self) -> bool:
+        """Занять слот; False — запрос нужно отклонить"""
+        if self._in_flight >= int(self._limit):
+            self.shed += 1
+            return False
+        self._in_flight += 1
+        return True
+
+    def release(self, latency: float) -> None:
+        """Освободить слот и скорректировать лимит по задержке запроса"""
+        in_flight = self._in_flight
+        self._in_flight -= 1
+        self.completed += 1
+        self._latency_ema += (latency - self._latency_ema) * 0.1
+        if latency > self.target_latency:
+            now = self._clock()
+            # Одна перегрузка дает много медленных ответов — уменьшаем лимит один раз
+            if now - self._last_decrease >= self.target_latency:
+                self._limit = max(self.min_limit, self._limit * self.backoff)
+                self._last_decrease = now
+        elif in_flight * 2 >= self._limit:
+            # Растем, только если лимит действительно используется
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+    def retry_after(self) -> int:
+        """Через сколько секунд имеет смысл повторить запрос"""
+        return max(1, math.ceil(self._latency_ema * 2))
+
+    def reset(self) -> None:
+        """Вернуть начальный лимит и обнулить счетчики"""
+        self._limit = float(self.initial)
+        self._last_decrease = -math.inf
+        self._latency_ema = 0.0
+        self.completed = 0
+        self.shed = 0
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "shed": self.shed,
+            "latency_ms": round(self._latency_ema * 1000, 1),
+        }
+
+
+class ConcurrencyLimiter:
+    """Лимиты по классам маршрутов; класс определяется по префиксу пути"""
+
+    def __init__(
+        self,
+        limits: Iterable[AdaptiveLimit],
+        route_classes: Dict[str, str],
+        default: str,
+        exempt_paths: Iterable[str] = (),
+    ):
+        self.limits = {limit.name: limit for limit in limits}
+        for name in (*route_classes.values(), default):
+            if name not in self.limits:
+                raise ValueError(f"unknown route class: {name}")
+        # Более длинные префиксы проверяются первыми
+        self._prefixes = sorted(route_classes.items(), key=lambda item: -len(item[0]))
+        self._default = self.limits[default]
+        self.exempt_paths = frozenset(exempt_paths)
+
+    def route_limit(self, path: str) -> Optional[AdaptiveLimit]:
+        """Лимит для пути; None для путей без ограничения"""
+        if path in self.exempt_paths:
+            return None
+        for prefix, name in self._prefixes:
+            if path == prefix or path.startswith(prefix + "/"):
+                return self.limits[name]
+        return self._default
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: limit.stats() for name, limit in self.limits.items()}
+
+    def reset(self) -> None:
+        for limit in self.limits.values():
+            limit.reset()
@@ -0,0 +1,95 @@
+"""Компактное колоночное хранилище фич.
+
+Вместо списка pydantic-моделей ``Feature`` (у каждой свой ``__dict__``, fields_set и т.д.)
+данные лежат в колонках: ``array('q')`` для id и голосов, списки строк для заголовков
+и описаний (заголовки интернируются). ``Feature`` создается только на границе API.
+"""
+
+import heapq
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .models import Feature
+
+
+class FeatureStore:
+    """Строки добавляются с возрастающими id, поэтому поиск по id — бинарный"""
+
+    __slots__ = ("ids", "votes", "titles", "descriptions")
+
+    def __init__(self) -> None:
+        self.ids = array("q")
+        self.votes = array("q")
+        self.titles: List[str] = []
+        self.descriptions: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(self, feature_id: int, title: str, description: str, votes: int = 0) -> int:
+        """Добавляет фичу и возвращает номер строки"""
+        if self.ids and feature_id <= self.ids[-1]:
+            raise ValueError("feature ids must be increasing")
+        self.ids.append(feature_id)
+        self.votes.append(votes)
+        self.titles.append(sys.intern(title))
+        self.descriptions.append(description)
+        return len(self.ids) - 1
+
+    def extend(self, rows: Iterable[Tuple[int, str, str, int]]) -> None:
+        for feature_id, title, description, votes in rows:
+            self.append(feature_id, title, description, votes)
+
+    def find(self, feature_id: int) -> Optional[int]:
+        """Номер строки по id или None"""
+        ids = self.ids
+        row = bisect_left(ids, feature_id)
+        if row < len(ids) and ids[row] == feature_id:
+            return row
+        return None
+
+    def add_votes(self, row: int, delta: int) -> None:
+        self.votes[row] += delta
+
+    def to_feature(self, row: int) -> Feature:
+        return Feature(
+            id=self.ids[row],
+            title=self.titles[row],
+            description=self.descriptions[row],
+            votes=self.votes[row],
+        )
+
+    def to_features(self, rows: Iterable[int]) -> List[Feature]:
+        return [self.to_feature(row) for row in rows]
+
+    def to_dicts(self, rows: Iterable[int]) -> List[dict]:
+        """Те же поля, что у Feature, но без создания моделей"""
+        ids, titles, descriptions, votes = self.ids, self.titles, self.descriptions, self.votes
+        return [
+            {
+                "id": ids[row],
+                "title": titles[row],
+                "description": descriptions[row],
+                "votes": votes[row],
+            }
+            for row in rows
+        ]
+
+    def top_rows(self, limit: int) -> List[int]:
+        """Строки с наибольшим числом голосов; при равенстве — в порядке создания"""
+        return heapq.nlargest(limit, range(len(self.ids)), key=self.votes.__getitem__)
+
+    def rows(self) -> Iterator[Tuple[int, str, str, int]]:
+        """Кортежи (id, title, description, votes) в порядке создания"""
+        return zip(self.ids, self.titles, self.descriptions, self.votes)
+
+    def copy(self) -> "FeatureStore":
+        """Копия колонок (копируются только ссылки на строки)"""
+        clone = FeatureStore()
+        clone.ids = array("q", self.ids)
+        clone.votes = array("q", self.votes)
+        clone.titles = list(self.titles)
+        clone.descriptions = list(self.descriptions)
+        return clone
@@ -1,47 +1,231 @@
-from typing import List
+import os
+import threading
+from typing import List, Optional, Tuple
 
-from .models import Feature, FeatureCreate, VoteRequest
+from . import persistence
+from .cache import FEATURE_CACHE_SIZE, FEATURE_CACHE_TTL, LRUCache, ReadThroughCache, SharedCache
+from .feature_store import FeatureStore
+from .models import Feature, FeatureCreate, TrendingFeature, VoteRequest
+from .trending import TrendingIndex
+from .voter_index import VoterIndex
 
-_FEATURES: List[Feature] = []
+# Внутреннее компактное представление; Feature создается только при выдаче наружу
+_STORE = FeatureStore()
 _next_feature_id = 1
+# Один голос на голосующего для каждой фичи
+_VOTERS = VoterIndex()
+# Таблица голосующих не очищается (нужна для дедупликации), поэтому ее размер ограничен
+MAX_VOTERS = int(os.getenv("FEATURES_MAX_VOTERS", "5000000"))
+# Голоса с затуханием для /features/trending (только в памяти, не журналируются)
+_TRENDING = TrendingIndex()
+
+# Изменения хранилища и запись в журнал идут под одной блокировкой,
+# чтобы порядок в журнале совпадал с порядком применения
+_lock = threading.Lock()
+_wal: Optional[persistence.FeatureLog] = None
+_snapshot_running = False
+
+
+class VoterLimitError(Exception):
+    """Достигнут предел числа голосующих (MAX_VOTERS)"""
+
+
+def _load_feature(feature_id: int) -> Optional[Feature]:
+    row = _STORE.find(feature_id)
+    if row is None:
+        return None
+    return _STORE.to_feature(row)
+
+
+def _encode_feature(feature: Feature) -> bytes:
+    return feature.model_dump_json().encode("utf-8")
+
+
+def _decode_feature(data: bytes) -> Feature:
+    return Feature.model_validate_json(data)
+
+
+# Read-through кэш для GET /features/{id}; сбрасывается при голосе и создании фичи
+_CACHE = ReadThroughCache(
+    _load_feature,
+    LRUCache(FEATURE_CACHE_SIZE, FEATURE_CACHE_TTL),
+    encode=_encode_feature,
+    decode=_decode_feature,
+    namespace="feature:",
+)
+
+
+def set_shared_cache(shared: Optional[SharedCache]) -> None:
+    """Подключить общий (межпроцессный) уровень кэша фич"""
+    _CACHE.set_shared(shared)
+
+
+def cache_stats() -> dict:
+    return _CACHE.stats()
+
+
+def enable_persistence(log: persistence.FeatureLog) -> None:
+    """Восстановить хранилище из снапшота и журнала и писать в журнал дальнейшие изменения"""
+    global _STORE, _VOTERS, _TRENDING, _wal, _next_feature_id
+    next_id, rows, voters = log.recover()
+    store = FeatureStore()
+    store.extend((feature_id, *row) for feature_id, row in rows.items())
+    with _lock:
+        _STORE = store
+        _VOTERS = voters
+        _TRENDING = TrendingIndex()
+        _next_feature_id = next_id
+        _wal = log
+    _CACHE.clear()
+
+
+def disable_persistence() -> None:
+    """Закрыть журнал (данные в памяти сохраняются)"""
+    global _wal
+    with _lock:
+        log, _wal = _wal, None
+    if log is not None:
+        log.close()
+
+
+def _log(record: bytes, count: int = 1) -> int:
+    """Записать операцию в журнал; вызывается под _lock"""
+    return _wal.append(record, count) if _wal is not None else 0
+
+
+def _commit(seq: int) -> None:
+    """Дождаться durability записи (вне _lock, чтобы fsync объединялись)"""
+    log = _wal
+    if log is None:
+        return
+    log.commit(seq)
+    if log.should_snapshot():
+        _start_snapshot(log)
+
+
+def _start_snapshot(log: persistence.FeatureLog) -> None:
+    """Ротация журнала под блокировкой, запись снапшота — в фоновом потоке"""
+    global _snapshot_running
+    with _lock:
+        if _snapshot_running or not log.should_snapshot():
+            return
+        _snapshot_running = True
+        generation = log.rotate()
+        # Под блокировкой только копируем колонки и берем copy-on-write срез голосов;
+        # сериализация — вне ее
+        store = _STORE.copy()
+        voters = _VOTERS.snapshot()
+        next_id = _next_feature_id
+
+    def write() -> None:
+        global _snapshot_running
+        try:
+            log.write_snapshot(generation, next_id, store.rows(), voters)
+        finally:
+            _snapshot_running = False
+
+    threading.Thread(target=write, name="features-snapshot", daemon=True).start()
 
 
 def get_all_features() -> List[Feature]:
     """Получить список всех фич"""
-    return _FEATURES
+    return _STORE.to_features(range(len(_STORE)))
+
+
+def get_all_feature_rows() -> List[dict]:
+    """Все фичи в виде словарей для прямой сериализации в JSON"""
+    return _STORE.to_dicts(range(len(_STORE)))
 
 
 def create_feature(data: FeatureCreate) -> Feature:
     """Создать новую фичу"""
     global _next_feature_id
-    feature = Feature(
-        id=_next_feature_id,
-        title=data.title,
-        description=data.description,
-        votes=0,
-    )
-    _FEATURES.append(feature)
-    _next_feature_id += 1
-    return feature
+    with _lock:
+        feature_id = _next_feature_id
+        row = _STORE.append(feature_id, data.title, data.description)
+        _next_feature_id += 1
+        seq = _log(persistence.encode_create(feature_id, data.title, data.description))
+    _commit(seq)
+    _CACHE.invalidate(feature_id)
+    return _STORE.to_feature(row)
+
+
+def create_features_bulk(rows: List[Tuple[str, str]]) -> List[Feature]:
+    """Создать фичи из уже провалидированных пар (title, description) одной операцией"""
+    return [_STORE.to_feature(row) for row in _create_rows(rows)]
+
+
+def create_features_bulk_ids(rows: List[Tuple[str, str]]) -> List[int]:
+    """То же, что create_features_bulk, но без построения моделей — только id"""
+    return [_STORE.ids[row] for row in _create_rows(rows)]
+
+
+def _create_rows(rows: List[Tuple[str, str]]) -> range:
+    global _next_feature_id
+    with _lock:
+        start = _next_feature_id
+        first_row = len(_STORE)
+        _STORE.extend(
+            (start + i, title, description, 0) for i, (title, description) in enumerate(rows)
+        )
+        _next_feature_id = start + len(rows)
+        seq = 0
+        if _wal is not None and rows:
+            record = b"".join(
+                persistence.encode_create(start + i, title, description)
+                for i, (title, description) in enumerate(rows)
+            )
+            seq = _log(record, len(rows))
+    _commit(seq)
+    # Новые id не инвалидируем: отсутствующие фичи (None) в кэш не попадают
+    return range(first_row, first_row + len(rows))
 
 
 def get_top_features(limit: int) -> List[Feature]:
     """Топ фич по голосам"""
-    return sorted(_FEATURES, key=lambda f: f.votes, reverse=True)[:limit]
+    return _STORE.to_features(_STORE.top_rows(limit))
+
+
+def get_trending_features(limit: int) -> List[TrendingFeature]:
+    """Топ фич по голосам с затуханием"""
+    with _lock:
+        top = _TRENDING.top(limit)
+    result = []
+    for feature_id, score in top:
+        row = _STORE.find(feature_id)
+        if row is not None:
+            feature = _STORE.to_feature(row)
+            result.append(TrendingFeature(**feature.model_dump(), score=round(score, 6)))
+    return result
 
 
-def get_feature_by_id(feature_id: int) -> Feature:
-    """Получить одну фичу по ID"""
-    for f in _FEATURES:
-        if f.id == feature_id:
-            return f
-    return None
+def get_feature_by_id(feature_id: int) -> Optional[Feature]:
+    """Получить одну фичу по ID (через кэш)"""
+    return _CACHE.get(feature_id)
 
 
-def vote_for_feature(feature_id: int, vote: VoteRequest) -> Feature:
-    """Проголосовать за фичу"""
-    for f in _FEATURES:
-        if f.id == feature_id:
-            f.votes += vote.value
-            return f
-    return None
+def vote_for_feature(feature_id: int, vote: VoteRequest, voter: str) -> Optional[Feature]:
+    """Проголосовать за фичу: повторный голос не учитывается, смена голоса — разницей"""
+    with _lock:
+        row = _STORE.find(feature_id)
+        if row is None:
+            return None
+        voter_id = _VOTERS.find_voter(voter)
+        is_new_voter = voter_id is None
+        if is_new_voter:
+            if _VOTERS.voter_count >= MAX_VOTERS:
+                raise VoterLimitError(voter)
+            voter_id, _ = _VOTERS.voter_id(voter)
+        delta = _VOTERS.cast(feature_id, voter_id, vote.value)
+        seq = 0
+        if is_new_voter:
+            seq = _log(persistence.encode_voter(voter_id, voter))
+        if delta:
+            _STORE.add_votes(row, delta)
+            _TRENDING.record(feature_id, delta)
+            seq = _log(persistence.encode_ballot(feature_id, voter_id, vote.value))
+    # Сначала durability, затем инвалидация (она не бросает исключений)
+    _commit(seq)
+    if delta:
+        _CACHE.invalidate(feature_id)
+    return _STORE.to_feature(row)
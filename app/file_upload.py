@@ -8,7 +8,7 @@ from typing import Optional, Tuple
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
 ALLOWED_EXTENSIONS = {".txt", ".pdf", ".png", ".jpg", ".jpeg"}
 UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+_upload_dir_ready = False
 
 # Magic bytes для проверки типов файлов
 MAGIC_BYTES = {
@@ -19,6 +19,15 @@ MAGIC_BYTES = {
 }
 
 
+def ensure_upload_dir() -> Path:
+    """Создает директорию загрузок при первом обращении (а не при импорте модуля)"""
+    global _upload_dir_ready
+    if not _upload_dir_ready:
+        UPLOAD_DIR.mkdir(exist_ok=True)
+        _upload_dir_ready = True
+    return UPLOAD_DIR
+
+
 def get_file_mime_type(file_content: bytes) -> Optional[str]:
     """Определяет тип файла по magic bytes"""
     if len(file_content) < 4:
@@ -74,7 +83,7 @@ def save_file(file_content: bytes, safe_filename: str) -> Path:
         raise ValueError("Invalid file path: path traversal detected")
 
     # Канонизация пути
-    upload_dir_abs = UPLOAD_DIR.resolve()
+    upload_dir_abs = ensure_upload_dir().resolve()
     file_path = (upload_dir_abs / safe_filename).resolve()
 
     # Проверка, что файл находится в UPLOAD_DIR (защита от path traversal)
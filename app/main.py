@@ -1,24 +1,92 @@
+import asyncio
 import time
 import uuid
-from collections import defaultdict, deque
-from typing import List
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, List
 
-from fastapi import FastAPI, File, HTTPException, Query, Request, UploadFile
+from fastapi import Body, FastAPI, File, HTTPException, Query, Request, UploadFile
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
-
-from . import features
-from .file_upload import generate_safe_filename, save_file, validate_file
-from .models import Feature, FeatureCreate, VoteRequest
-from .security import safe_log_error, sanitize_error_detail
-
-app = FastAPI(title="SecDev Course App", version="0.3.0")
+from starlette.concurrency import run_in_threadpool
+
+from . import cache, chunked_upload, features, persistence, processing
+from .batch_validation import validate_feature_batch
+from .compression import CompressionMiddleware
+from .concurrency import AdaptiveLimit, ConcurrencyLimiter
+from .file_upload import ensure_upload_dir, generate_safe_filename, save_file, validate_file
+from .models import Feature, FeatureCreate, TrendingFeature, UploadSessionCreate, VoteRequest
+from .rate_limit import Limit, RateLimiter, rate_limit_headers
+from .responses import FastJSONResponse
+from .security import (
+    api_key_principal,
+    client_network,
+    configure_logging,
+    safe_log_error,
+    sanitize_error_detail,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Инициализация подсистем при старте воркера, а не при импорте модулей.
+
+    Все подсистемы также создаются лениво при первом обращении, поэтому приложение
+    работает и без lifespan (например, в TestClient без контекстного менеджера).
+    """
+    configure_logging()
+    ensure_upload_dir()
+    await run_in_threadpool(chunked_upload.sweep_expired)
+    if persistence.FEATURES_WAL_DIR:
+        log = persistence.FeatureLog(Path(persistence.FEATURES_WAL_DIR))
+        await run_in_threadpool(features.enable_persistence, log)
+    if cache.FEATURE_CACHE_REDIS_URL:
+        features.set_shared_cache(cache.RedisCache.from_url(cache.FEATURE_CACHE_REDIS_URL))
+    yield
+    await run_in_threadpool(processing.shutdown)
+    await run_in_threadpool(features.disable_persistence)
+    features.set_shared_cache(None)
+
+
+app = FastAPI(
+    title="SecDev Course App",
+    version="0.3.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
+# Сжатие ответов (gzip / brotli) по Accept-Encoding
+app.add_middleware(CompressionMiddleware)
+
+MAX_FILES_PER_REQUEST = 10
+MAX_BULK_FEATURES = 10_000
 
 
 # -------- Rate Limiting (NFR-07) --------
-_RATE_LIMIT_RPS = 10  # per IP
-_RATE_WINDOW_SEC = 1.0
-_ip_to_requests = defaultdict(lambda: deque())  # ip -> deque[timestamps]
+# 10 RPS на IP и 100 RPS на пользователя / API-ключ; тяжелые маршруты стоят дороже
+RATE_LIMITS = [
+    Limit(name="ip", key="ip", rate=10, burst=10),
+    Limit(name="user", key="user", rate=100, burst=100),
+    Limit(name="api_key", key="api_key", rate=100, burst=200),
+]
+ROUTE_COSTS = {
+    ("POST", "/upload"): 2,
+    ("POST", "/upload/batch"): 5,
+    ("POST", "/features/bulk"): 5,
+}
+rate_limiter = RateLimiter(RATE_LIMITS, ROUTE_COSTS, exempt_paths={"/health"})
+
+# -------- Overload Protection (NFR-04) --------
+# Одновременные запросы по классам маршрутов; в сумме меньше пула потоков (40),
+# чтобы /health и асинхронные обработчики не ждали свободного потока
+CONCURRENCY_LIMITS = [
+    AdaptiveLimit(name="upload", initial=4, max_limit=8),
+    AdaptiveLimit(name="bulk", initial=2, max_limit=4),
+    AdaptiveLimit(name="default", initial=16, max_limit=24),
+]
+ROUTE_CLASSES = {"/upload": "upload", "/uploads": "upload", "/features/bulk": "bulk"}
+concurrency_limiter = ConcurrencyLimiter(
+    CONCURRENCY_LIMITS, ROUTE_CLASSES, default="default", exempt_paths={"/health"}
+)
 
 
 @app.middleware("http")
@@ -27,20 +95,9 @@ async def correlation_and_rate_limit_middleware(request: Request, call_next):
     correlation_id = request.headers.get("X-Correlation-ID") or str(uuid.uuid4())
     request.state.correlation_id = correlation_id
 
-    if request.url.path == "/health":
-        response = await call_next(request)
-        response.headers["X-Correlation-ID"] = correlation_id
-        return response
-
-    client_ip = request.client.host if request.client else "unknown"
-    now = time.monotonic()
-    window = _ip_to_requests[client_ip]
-
-    threshold = now - _RATE_WINDOW_SEC
-    while window and window[0] < threshold:
-        window.popleft()
-
-    if len(window) >= _RATE_LIMIT_RPS:
+    decision = rate_limiter.check(request)
+    limit_headers = rate_limit_headers(decision) if decision is not None else {}
+    if decision is not None and not decision.allowed:
         problem = _build_problem(
             request,
             status=429,
@@ -52,14 +109,39 @@ async def correlation_and_rate_limit_middleware(request: Request, call_next):
             status_code=429,
             content=problem,
             headers={
-                "Retry-After": "1",
+                **limit_headers,
+                "Content-Type": "application/problem+json",
+                "X-Correlation-ID": correlation_id,
+            },
+        )
+
+    route_limit = concurrency_limiter.route_limit(request.url.path)
+    if route_limit is not None and not route_limit.try_acquire():
+        # Сбрасываем нагрузку до обработчика: ответ дешевый и не занимает пул потоков
+        problem = _build_problem(
+            request,
+            status=503,
+            title="Service Unavailable",
+            detail="Server is overloaded, retry later",
+            type_="https://example.com/problems/overloaded",
+        )
+        return JSONResponse(
+            status_code=503,
+            content=problem,
+            headers={
+                "Retry-After": str(route_limit.retry_after()),
                 "Content-Type": "application/problem+json",
                 "X-Correlation-ID": correlation_id,
             },
         )
 
-    window.append(now)
-    response = await call_next(request)
+    started = time.monotonic()
+    try:
+        response = await call_next(request)
+    finally:
+        if route_limit is not None:
+            route_limit.release(time.monotonic() - started)
+    response.headers.update(limit_headers)
     response.headers["X-Correlation-ID"] = correlation_id
     return response
 
@@ -90,7 +172,10 @@ async def api_error_handler(request: Request, exc: ApiError):
     title_map = {
         "validation_error": "Validation Error",
         "not_found": "Not Found",
+        "unauthorized": "Unauthorized",
         "rate_limited": "Too Many Requests",
+        "conflict": "Conflict",
+        "service_unavailable": "Service Unavailable",
         "http_error": "HTTP Error",
     }
     correlation_id = getattr(request.state, "correlation_id", str(uuid.uuid4()))
@@ -191,10 +276,23 @@ async def unhandled_exception_handler(request: Request, exc: Exception):
 
 # -------- Health --------
 @app.get("/health")
-def health():
+async def health():
+    # async: не зависит от свободных потоков в пуле даже при перегрузке
     return {"status": "ok"}
 
 
+@app.get("/metrics/cache")
+def cache_metrics():
+    """Попадания и промахи кэша GET /features/{id}"""
+    return {"features": features.cache_stats()}
+
+
+@app.get("/metrics/concurrency")
+def concurrency_metrics():
+    """Текущие лимиты одновременных запросов и число сброшенных запросов"""
+    return concurrency_limiter.stats()
+
+
 # -------- Demo Items (для тестов) --------
 _DB = {"items": []}
 
@@ -222,7 +320,8 @@ def get_item(item_id: int):
 @app.get("/features", response_model=List[Feature])
 def list_features():
     """Получить список всех фич"""
-    return features.get_all_features()
+    # Строки из хранилища кодируются напрямую, без моделей и повторной валидации ответа
+    return FastJSONResponse(features.get_all_feature_rows())
 
 
 @app.post("/features", response_model=Feature)
@@ -233,12 +332,53 @@ def create_feature(data: FeatureCreate):
     return features.create_feature(data)
 
 
+@app.post("/features/bulk")
+def create_features_bulk(request: Request, rows: List[Any] = Body(...)):
+    """Массовое создание фич: все строки проверяются за один проход, ошибки по строкам"""
+    if len(rows) > MAX_BULK_FEATURES:
+        raise ApiError(
+            code="validation_error",
+            message=f"at most {MAX_BULK_FEATURES} features per request",
+            status=422,
+        )
+    valid, errors = validate_feature_batch(rows)
+    if errors:
+        correlation_id = request.state.correlation_id
+        safe_log_error("Bulk validation error", correlation_id, f"{len(errors)} invalid rows")
+        problem = _build_problem(
+            request,
+            status=422,
+            title="Validation Error",
+            detail=f"{len(errors)} invalid rows, nothing was created",
+            type_="https://example.com/problems/validation_error",
+        )
+        for error in errors:
+            error["detail"] = sanitize_error_detail(error["detail"])
+        problem["errors"] = errors
+        return JSONResponse(
+            status_code=422,
+            content=problem,
+            headers={
+                "Content-Type": "application/problem+json",
+                "X-Correlation-ID": correlation_id,
+            },
+        )
+    ids = features.create_features_bulk_ids(valid)
+    return {"created": len(ids), "ids": ids}
+
+
 @app.get("/features/top", response_model=List[Feature])
 def top_features(limit: int = Query(5, ge=1, le=100)):
     """Топ фич по голосам"""
     return features.get_top_features(limit)
 
 
+@app.get("/features/trending", response_model=List[TrendingFeature])
+def trending_features(limit: int = Query(5, ge=1, le=100)):
+    """Топ фич по недавним голосам (вклад голоса затухает со временем)"""
+    return features.get_trending_features(limit)
+
+
 @app.get("/features/{feature_id}", response_model=Feature)
 def get_feature(feature_id: int):
     """Получить одну фичу"""
@@ -248,22 +388,40 @@ def get_feature(feature_id: int):
     return feature
 
 
+def _client_identity(request: Request) -> str:
+    """Кто делает запрос: принципал проверенного X-API-Key, а без ключа — адрес клиента.
+
+    По нему считаются голоса и открытые сессии загрузки. Заголовки, которые клиент может
+    выбрать сам (X-User-ID), не учитываются: иначе каждый новый заголовок давал бы новый
+    голос. Без ключа все клиенты за одним NAT (или в одной IPv6-сети /64) считаются одним.
+    """
+    api_key = request.headers.get("X-API-Key")
+    if api_key is not None:
+        principal = api_key_principal(api_key)
+        if principal is None:
+            raise ApiError(code="unauthorized", message="invalid API key", status=401)
+        return f"key:{principal}"
+    return f"ip:{client_network(request.client.host) if request.client else 'unknown'}"
+
+
 @app.post("/features/{feature_id}/vote", response_model=Feature)
-def vote_feature(feature_id: int, vote: VoteRequest):
-    """Проголосовать за фичу"""
+def vote_feature(feature_id: int, vote: VoteRequest, request: Request):
+    """Проголосовать за фичу (один голос на голосующего, голос можно изменить)"""
     if vote.value not in (-1, 1):
         raise ApiError(code="validation_error", message="vote must be +1 or -1", status=422)
-    feature = features.vote_for_feature(feature_id, vote)
+    try:
+        feature = features.vote_for_feature(feature_id, vote, _client_identity(request))
+    except features.VoterLimitError:
+        raise ApiError(
+            code="service_unavailable", message="voter capacity reached", status=503
+        ) from None
     if feature is None:
         raise ApiError(code="not_found", message="feature not found", status=404)
     return feature
 
 
-@app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    """Безопасная загрузка файла с проверкой magic bytes, лимитов и UUID именами"""
-    # Чтение файла с лимитом размера
-    file_content = await file.read()
+def _store_upload(file_content: bytes, filename: str) -> dict:
+    """Проверяет и сохраняет файл; общая часть для всех вариантов загрузки"""
     if len(file_content) == 0:
         raise ApiError(
             code="validation_error",
@@ -272,7 +430,7 @@ async def upload_file(file: UploadFile = File(...)):
         )
 
     # Валидация файла
-    is_valid, error_msg = validate_file(file_content, file.filename or "unknown")
+    is_valid, error_msg = validate_file(file_content, filename or "unknown")
     if not is_valid:
         raise ApiError(
             code="validation_error",
@@ -280,17 +438,19 @@ async def upload_file(file: UploadFile = File(...)):
             status=422,
         )
 
+    # Не принимаем файл, если очередь обработки переполнена
+    if processing.is_full():
+        raise ApiError(
+            code="service_unavailable",
+            message="processing queue is full, retry later",
+            status=503,
+        )
+
     try:
         # Генерация безопасного имени
-        safe_filename = generate_safe_filename(file.filename or "file")
+        safe_filename = generate_safe_filename(filename or "file")
         # Сохранение файла
         save_file(file_content, safe_filename)
-
-        return {
-            "filename": safe_filename,
-            "size": len(file_content),
-            "message": "File uploaded successfully",
-        }
     except ValueError as e:
         raise ApiError(
             code="validation_error",
@@ -298,6 +458,132 @@ async def upload_file(file: UploadFile = File(...)):
             status=422,
         )
 
+    # Обработка (checksum, scan, ...) идет в фоне, ответ не ждет ее завершения
+    try:
+        processing.enqueue_file(safe_filename)
+        processing_status = "queued"
+    except processing.QueueFullError:
+        # Очередь заполнилась после проверки: файл уже сохранен, фиксируем конечный статус
+        processing.mark_skipped(safe_filename)
+        processing_status = "skipped"
+
+    return {
+        "filename": safe_filename,
+        "size": len(file_content),
+        "message": "File uploaded successfully",
+        "processing": processing_status,
+    }
+
+
+@app.post("/upload")
+async def upload_file(file: UploadFile = File(...)):
+    """Безопасная загрузка файла с проверкой magic bytes, лимитов и UUID именами"""
+    # Чтение файла с лимитом размера
+    file_content = await file.read()
+    return await run_in_threadpool(_store_upload, file_content, file.filename or "unknown")
+
+
+async def _store_upload_result(file: UploadFile) -> dict:
+    """Результат загрузки одного файла из пакета (ошибка не прерывает остальные)"""
+    file_content = await file.read()
+    try:
+        result = await run_in_threadpool(_store_upload, file_content, file.filename or "unknown")
+    except ApiError as e:
+        return {"status": "error", "detail": sanitize_error_detail(e.message)}
+    return {"status": "ok", **result}
+
+
+@app.post("/upload/batch")
+async def upload_files(files: List[UploadFile] = File(...)):
+    """Загрузка нескольких файлов одним multipart-запросом, файлы обрабатываются параллельно"""
+    if len(files) > MAX_FILES_PER_REQUEST:
+        raise ApiError(
+            code="validation_error",
+            message=f"at most {MAX_FILES_PER_REQUEST} files per request",
+            status=422,
+        )
+    results = await asyncio.gather(*(_store_upload_result(f) for f in files))
+    return {"files": list(results)}
+
+
+@app.get("/upload/{filename}/status")
+def upload_status(filename: str):
+    """Статус фоновой обработки загруженного файла"""
+    status = processing.get_file_status(filename)
+    if status is None:
+        raise ApiError(code="not_found", message="file not found", status=404)
+    return status
+
+
+# -------- Chunked Uploads --------
+
+
+def _session_call(func, *args):
+    """Вызов функции chunked_upload с переводом ошибок сессии в ApiError"""
+    try:
+        return func(*args)
+    except chunked_upload.UploadSessionError as e:
+        raise ApiError(code=e.code, message=e.message, status=e.status)
+
+
+@app.post("/uploads/sessions")
+def create_upload_session(data: UploadSessionCreate, request: Request):
+    """Создать сессию возобновляемой загрузки (число открытых сессий клиента ограничено)"""
+    return _session_call(
+        chunked_upload.create_session,
+        data.filename,
+        data.size,
+        data.chunk_size,
+        _client_identity(request),
+    )
+
+
+@app.put("/uploads/sessions/{upload_id}/chunks/{index}")
+async def put_upload_chunk(upload_id: str, index: int, request: Request):
+    """Загрузить чанк; порядок произвольный, повторная отправка идемпотентна"""
+    expected = await run_in_threadpool(
+        _session_call, chunked_upload.expected_chunk_length, upload_id, index
+    )
+    # Читаем тело потоком и обрываем, если чанк больше ожидаемого
+    data = bytearray()
+    async for part in request.stream():
+        data.extend(part)
+        if len(data) > expected:
+            raise ApiError(
+                code="validation_error",
+                message=f"chunk {index} must be exactly {expected} bytes",
+                status=422,
+            )
+    await run_in_threadpool(
+        _session_call, chunked_upload.write_chunk, upload_id, index, bytes(data)
+    )
+    return {"upload_id": upload_id, "index": index, "size": len(data)}
+
+
+@app.get("/uploads/sessions/{upload_id}")
+def get_upload_session(upload_id: str):
+    """Полученные диапазоны чанков"""
+    return _session_call(chunked_upload.get_status, upload_id)
+
+
+@app.post("/uploads/sessions/{upload_id}/complete")
+def complete_upload_session(upload_id: str):
+    """Собрать файл, проверить его как обычную загрузку и удалить сессию.
+
+    При временной ошибке (503 из-за заполненной очереди) сессия сохраняется, и
+    финализацию можно повторить без повторной отправки чанков. Файл, не прошедший
+    проверку, повтор не исправит — такая сессия удаляется.
+    """
+    file_content, filename = _session_call(chunked_upload.assemble, upload_id)
+    try:
+        result = _store_upload(file_content, filename)
+    except ApiError as e:
+        if e.status != 503:
+            chunked_upload.delete_session(upload_id)
+        raise
+    chunked_upload.delete_session(upload_id)
+    return result
+
 
 @app.get("/")
 def root():
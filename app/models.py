@@ -40,3 +40,13 @@ class Feature(BaseModel):
     title: str
     description: str
     votes: int
+
+
+class TrendingFeature(Feature):
+    score: float  # голоса с экспоненциальным затуханием
+
+
+class UploadSessionCreate(BaseModel):
+    filename: Annotated[str, Field(min_length=1, max_length=255)]
+    size: Annotated[int, Field(ge=1)]
+    chunk_size: Annotated[int, Field(ge=1)] = 1024 * 1024
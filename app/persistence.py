@@ -0,0 +1,356 @@
+"""Журнал упреждающей записи (WAL) и снапшоты для in-memory хранилища фич.
+
+Формат файлов в директории ``FEATURES_WAL_DIR``:
+- ``wal-<gen>.log`` — записи ``<op:u8><len:u32><crc32:u32><payload>``;
+- ``snapshot-<gen>.bin`` — состояние на момент начала ``wal-<gen>.log``
+  (фичи, затем таблица голосующих и их голоса по фичам).
+
+Восстановление: последний целый снапшот + все журналы того же и более новых поколений.
+Оборванный хвост журнала (после падения) отбрасывается по CRC.
+
+Политики fsync:
+- ``always`` — fsync после каждой записи;
+- ``batch`` — групповой коммит: один поток делает fsync за всех, кто успел записать;
+- ``off`` — только запись в ОС (переживает падение процесса, но не питания).
+"""
+
+import os
+import re
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .voter_index import VoterIndex, VoterSnapshot
+
+FEATURES_WAL_DIR = os.getenv("FEATURES_WAL_DIR", "")
+FEATURES_WAL_FSYNC = os.getenv("FEATURES_WAL_FSYNC", "batch")
+FEATURES_SNAPSHOT_EVERY = int(os.getenv("FEATURES_SNAPSHOT_EVERY", "100000"))
+
+FSYNC_POLICIES = ("always", "batch", "off")
+
+OP_CREATE = 1
+OP_VOTER = 2
+OP_BALLOT = 3
+
+_HEADER = struct.Struct("<BII")
+_CREATE = struct.Struct("<qHI")
+_VOTER = struct.Struct("<I")
+_BALLOT = struct.Struct("<qIb")
+_SNAPSHOT_MAGIC = b"FSNP"
+_SNAPSHOT_HEADER = struct.Struct("<Iqq")  # version, next_id, count
+_SNAPSHOT_ROW = struct.Struct("<qqHI")  # id, votes, title_len, description_len
+_SNAPSHOT_BALLOTS = struct.Struct("<qII")  # feature_id, n_up, n_down
+_SNAPSHOT_VERSION = 1
+_FILE_RE = re.compile(r"^(wal|snapshot)-(\d{8})\.(log|bin)$")
+
+# id -> [title, description, votes]; порядок ключей — порядок создания
+FeatureRows = Dict[int, list]
+
+
+def encode_create(feature_id: int, title: str, description: str) -> bytes:
+    title_b = title.encode("utf-8")
+    description_b = description.encode("utf-8")
+    payload = _CREATE.pack(feature_id, len(title_b), len(description_b)) + title_b + description_b
+    return _HEADER.pack(OP_CREATE, len(payload), zlib.crc32(payload)) + payload
+
+
+def encode_voter(voter_id: int, key: str) -> bytes:
+    payload = _VOTER.pack(voter_id) + key.encode("utf-8")
+    return _HEADER.pack(OP_VOTER, len(payload), zlib.crc32(payload)) + payload
+
+
+def encode_ballot(feature_id: int, voter_id: int, value: int) -> bytes:
+    payload = _BALLOT.pack(feature_id, voter_id, value)
+    return _HEADER.pack(OP_BALLOT, len(payload), zlib.crc32(payload)) + payload
+
+
+def _ids_to_bytes(ids: Iterable[int]) -> bytes:
+    packed = array("I", ids)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _ids_from_bytes(data) -> List[int]:
+    packed = array("I")
+    packed.frombytes(data)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tolist()
+
+
+def replay(data: bytes, rows: FeatureRows, next_id: int, voters: VoterIndex) -> Tuple[int, int]:
+    """Применяет записи журнала к rows и voters; возвращает (next_id, длина корректной части)"""
+    view = memoryview(data)
+    offset = 0
+    end = len(data)
+    header_size = _HEADER.size
+    unpack_header = _HEADER.unpack_from
+    crc32 = zlib.crc32
+    while offset + header_size <= end:
+        op, length, crc = unpack_header(data, offset)
+        start = offset + header_size
+        stop = start + length
+        if stop > end or crc32(view[start:stop]) != crc:
+            break
+        if op == OP_BALLOT:
+            feature_id, voter_id, value = _BALLOT.unpack_from(data, start)
+            row = rows.get(feature_id)
+            if row is not None:
+                row[2] += voters.cast(feature_id, voter_id, value)
+        elif op == OP_VOTER:
+            (voter_id,) = _VOTER.unpack_from(data, start)
+            key = str(view[start + _VOTER.size : stop], "utf-8")
+            if voters.voter_id(key)[0] != voter_id:
+                break
+        elif op == OP_CREATE:
+            feature_id, title_len, description_len = _CREATE.unpack_from(data, start)
+            pos = start + _CREATE.size
+            title = str(view[pos : pos + title_len], "utf-8")
+            pos += title_len
+            description = str(view[pos : pos + description_len], "utf-8")
+            rows[feature_id] = [title, description, 0]
+            next_id = max(next_id, feature_id + 1)
+        else:
+            break
+        offset = stop
+    return next_id, offset
+
+
+def encode_snapshot(
+    next_id: int,
+    rows: Iterable[Tuple[int, str, str, int]],
+    voters: Union[VoterIndex, VoterSnapshot],
+) -> bytes:
+    parts: List[bytes] = []
+    count = 0
+    pack_row = _SNAPSHOT_ROW.pack
+    for feature_id, title, description, votes in rows:
+        title_b = title.encode("utf-8")
+        description_b = description.encode("utf-8")
+        parts.append(pack_row(feature_id, votes, len(title_b), len(description_b)))
+        parts.append(title_b)
+        parts.append(description_b)
+        count += 1
+
+    keys = voters.voter_keys()
+    parts.append(struct.pack("<q", len(keys)))
+    for key in keys:
+        key_b = key.encode("utf-8")
+        parts.append(struct.pack("<H", len(key_b)))
+        parts.append(key_b)
+    ballots = list(voters.ballots())
+    parts.append(struct.pack("<q", len(ballots)))
+    for feature_id, up, down in ballots:
+        parts.append(_SNAPSHOT_BALLOTS.pack(feature_id, len(up), len(down)))
+        parts.append(_ids_to_bytes(sorted(up)))
+        parts.append(_ids_to_bytes(sorted(down)))
+
+    body = _SNAPSHOT_HEADER.pack(_SNAPSHOT_VERSION, next_id, count) + b"".join(parts)
+    return _SNAPSHOT_MAGIC + body + struct.pack("<I", zlib.crc32(body))
+
+
+def decode_snapshot(data: bytes) -> Optional[Tuple[int, FeatureRows, VoterIndex]]:
+    """Разбирает снапшот; None, если файл поврежден"""
+    if len(data) < 8 + _SNAPSHOT_HEADER.size or not data.startswith(_SNAPSHOT_MAGIC):
+        return None
+    body = data[4:-4]
+    if zlib.crc32(body) != struct.unpack("<I", data[-4:])[0]:
+        return None
+    version, next_id, count = _SNAPSHOT_HEADER.unpack_from(body)
+    if version != _SNAPSHOT_VERSION:
+        return None
+    rows: FeatureRows = {}
+    pos = _SNAPSHOT_HEADER.size
+    unpack_row = _SNAPSHOT_ROW.unpack_from
+    row_size = _SNAPSHOT_ROW.size
+    for _ in range(count):
+        feature_id, votes, title_len, description_len = unpack_row(body, pos)
+        pos += row_size
+        title = body[pos : pos + title_len].decode("utf-8")
+        pos += title_len
+        description = body[pos : pos + description_len].decode("utf-8")
+        pos += description_len
+        rows[feature_id] = [title, description, votes]
+
+    voters = VoterIndex()
+    (voter_count,) = struct.unpack_from("<q", body, pos)
+    pos += 8
+    for _ in range(voter_count):
+        (key_len,) = struct.unpack_from("<H", body, pos)
+        pos += 2
+        voters.voter_id(body[pos : pos + key_len].decode("utf-8"))
+        pos += key_len
+    (ballot_count,) = struct.unpack_from("<q", body, pos)
+    pos += 8
+    for _ in range(ballot_count):
+        feature_id, n_up, n_down = _SNAPSHOT_BALLOTS.unpack_from(body, pos)
+        pos += _SNAPSHOT_BALLOTS.size
+        up = _ids_from_bytes(body[pos : pos + 4 * n_up])
+        pos += 4 * n_up
+        down = _ids_from_bytes(body[pos : pos + 4 * n_down])
+        pos += 4 * n_down
+        voters.restore(feature_id, up, down)
+    return next_id, rows, voters
+
+
+class FeatureLog:
+    """Журнал операций хранилища фич с групповым коммитом и ротацией по снапшотам"""
+
+    def __init__(
+        self,
+        directory: Path,
+        fsync: str = FEATURES_WAL_FSYNC,
+        snapshot_every: int = FEATURES_SNAPSHOT_EVERY,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync policy must be one of {FSYNC_POLICIES}")
+        self.directory = Path(directory)
+        self.fsync = fsync
+        self.snapshot_every = snapshot_every
+        self._cond = threading.Condition()
+        self._file = None
+        self._generation = 0
+        self._appended = 0
+        self._durable = 0
+        self._flushing = False
+        self._since_snapshot = 0
+
+    # -------- Восстановление --------
+
+    def _files(self, kind: str) -> List[Tuple[int, Path]]:
+        found = []
+        for path in self.directory.iterdir():
+            match = _FILE_RE.match(path.name)
+            if match and match.group(1) == kind:
+                found.append((int(match.group(2)), path))
+        return sorted(found)
+
+    def _path(self, kind: str, generation: int) -> Path:
+        ext = "log" if kind == "wal" else "bin"
+        return self.directory / f"{kind}-{generation:08d}.{ext}"
+
+    def recover(self) -> Tuple[int, FeatureRows, VoterIndex]:
+        """Загружает снапшот и проигрывает журналы; открывает журнал для дозаписи"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        next_id, rows, voters, base_generation = 1, {}, VoterIndex(), 0
+        for generation, path in reversed(self._files("snapshot")):
+            decoded = decode_snapshot(path.read_bytes())
+            if decoded is not None:
+                next_id, rows, voters = decoded
+                base_generation = generation
+                break
+
+        generation = base_generation
+        for generation, path in self._files("wal"):
+            if generation < base_generation:
+                continue
+            data = path.read_bytes()
+            next_id, valid_length = replay(data, rows, next_id, voters)
+            if valid_length < len(data):
+                # Оборванная запись в конце журнала — отбрасываем
+                with open(path, "r+b") as f:
+                    f.truncate(valid_length)
+
+        self._generation = max(generation, base_generation)
+        self._file = open(self._path("wal", self._generation), "ab")
+        return next_id, rows, voters
+
+    # -------- Запись --------
+
+    def append(self, record: bytes, count: int = 1) -> int:
+        """Дописывает записи в журнал; возвращает номер для commit()"""
+        with self._cond:
+            self._file.write(record)
+            self._appended += 1
+            self._since_snapshot += count
+            seq = self._appended
+            if self.fsync == "always":
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._durable = seq
+            elif self.fsync == "off":
+                self._file.flush()
+                self._durable = seq
+        return seq
+
+    def commit(self, seq: int) -> None:
+        """Ждет, пока запись seq станет durable (групповой коммит для политики batch)"""
+        with self._cond:
+            while self._durable < seq:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                # Этот поток — лидер: один fsync за все накопленные записи
+                self._flushing = True
+                target = self._appended
+                self._file.flush()
+                fd = self._file.fileno()
+                self._cond.release()
+                try:
+                    os.fsync(fd)
+                finally:
+                    self._cond.acquire()
+                    self._flushing = False
+                    self._durable = max(self._durable, target)
+                    self._cond.notify_all()
+
+    # -------- Снапшоты --------
+
+    def should_snapshot(self) -> bool:
+        return self.snapshot_every > 0 and self._since_snapshot >= self.snapshot_every
+
+    def rotate(self) -> int:
+        """Начинает новый журнал; вызывается под блокировкой хранилища.
+
+        Возвращает поколение, для которого нужно записать снапшот текущего состояния.
+        """
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._durable = self._appended
+            self._generation += 1
+            self._since_snapshot = 0
+            self._file = open(self._path("wal", self._generation), "ab")
+            return self._generation
+
+    def write_snapshot(
+        self,
+        generation: int,
+        next_id: int,
+        rows: Iterable[Tuple[int, str, str, int]],
+        voters: Union[VoterIndex, VoterSnapshot],
+    ) -> Path:
+        """Атомарно записывает снапшот и удаляет файлы предыдущих поколений"""
+        path = self._path("snapshot", generation)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(encode_snapshot(next_id, rows, voters))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        dir_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        for kind in ("snapshot", "wal"):
+            for old_generation, old_path in self._files(kind):
+                if old_generation < generation:
+                    old_path.unlink(missing_ok=True)
+        return path
+
+    def close(self) -> None:
+        with self._cond:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
@@ -0,0 +1,356 @@
+"""Фоновая обработка загруженных файлов.
+
+Очередь заданий хранится в локальной SQLite (вместо Redis, чтобы работать без внешних
+сервисов) и переживает перезапуск. Поток-диспетчер забирает задания из очереди и
+отправляет CPU-bound шаги в пул процессов; результаты пишутся обратно в SQLite.
+
+Пул создается лениво, когда в процессе уже работают потоки (пул запросов, диспетчер,
+снапшоты фич), поэтому воркеры запускаются через forkserver: fork многопоточного
+процесса может оставить в дочернем блокировку, которую держал другой поток.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .file_upload import UPLOAD_DIR
+
+PROCESSING_WORKERS = int(os.getenv("PROCESSING_WORKERS", "2"))
+MAX_QUEUE_SIZE = int(os.getenv("PROCESSING_MAX_QUEUE", "1000"))  # pending-заданий
+# forkserver или spawn; fork небезопасен для многопоточного процесса
+PROCESSING_START_METHOD = os.getenv("PROCESSING_START_METHOD", "forkserver")
+QUEUE_DB_PATH = Path(os.getenv("PROCESSING_QUEUE_DB", str(UPLOAD_DIR / ".jobs.sqlite3")))
+
+_EICAR_SIGNATURE = b"EICAR-STANDARD-ANTIVIRUS-TEST-FILE"
+_PDF_PAGE_RE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+_READ_BLOCK = 64 * 1024
+
+
+# -------- Шаги обработки (выполняются в пуле процессов) --------
+
+
+def step_checksum(path: str) -> dict:
+    """SHA-256 файла"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_READ_BLOCK), b""):
+            digest.update(block)
+    return {"sha256": digest.hexdigest()}
+
+
+def step_scan(path: str) -> dict:
+    """Заглушка антивируса: поиск тестовой сигнатуры EICAR"""
+    content = Path(path).read_bytes()
+    return {"infected": _EICAR_SIGNATURE in content}
+
+
+def step_image_info(path: str) -> dict:
+    """Размеры PNG из заголовка IHDR (заглушка для генерации миниатюр)"""
+    with open(path, "rb") as f:
+        header = f.read(24)
+    if len(header) < 24 or header[12:16] != b"IHDR":
+        raise ValueError("PNG header is malformed")
+    width = int.from_bytes(header[16:20], "big")
+    height = int.from_bytes(header[20:24], "big")
+    return {"width": width, "height": height}
+
+
+def step_pdf_pages(path: str) -> dict:
+    """Количество страниц PDF по объектам /Type /Page"""
+    content = Path(path).read_bytes()
+    return {"pages": len(_PDF_PAGE_RE.findall(content))}
+
+
+STEPS: Dict[str, Callable[[str], dict]] = {
+    "checksum": step_checksum,
+    "scan": step_scan,
+    "image_info": step_image_info,
+    "pdf_pages": step_pdf_pages,
+}
+
+_STEPS_BY_EXTENSION = {
+    ".png": ["image_info"],
+    ".pdf": ["pdf_pages"],
+}
+
+
+def steps_for(filename: str) -> List[str]:
+    """Список шагов обработки для файла"""
+    return ["checksum", "scan", *_STEPS_BY_EXTENSION.get(Path(filename).suffix.lower(), [])]
+
+
+def run_step(step: str, path: str) -> dict:
+    """Точка входа в дочернем процессе"""
+    return STEPS[step](path)
+
+
+# -------- Очередь заданий (SQLite) --------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT NOT NULL,
+    step TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS jobs_filename_idx ON jobs (filename);
+"""
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    global _schema_ready
+    QUEUE_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(QUEUE_DB_PATH, timeout=5.0, isolation_level=None)
+    try:
+        if not _schema_ready:
+            with _schema_lock:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _schema_ready = True
+        yield conn
+    finally:
+        conn.close()
+
+
+class QueueFullError(Exception):
+    """Очередь заполнена — клиенту стоит повторить запрос позже"""
+
+
+def pending_count() -> int:
+    with _connect() as conn:
+        return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'pending'").fetchone()[0]
+
+
+def is_full() -> bool:
+    return pending_count() >= MAX_QUEUE_SIZE
+
+
+def enqueue_file(filename: str) -> List[str]:
+    """Ставит в очередь шаги обработки сохраненного файла"""
+    steps = steps_for(filename)
+    now = time.time()
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'pending'").fetchone()[0]
+        if pending + len(steps) > MAX_QUEUE_SIZE:
+            conn.execute("ROLLBACK")
+            raise QueueFullError("processing queue is full")
+        conn.executemany(
+            "INSERT INTO jobs (filename, step, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            [(filename, step, now, now) for step in steps],
+        )
+        conn.execute("COMMIT")
+    _get_dispatcher().wake()
+    return steps
+
+
+def mark_skipped(filename: str, reason: str = "processing queue is full") -> None:
+    """Конечный статус для сохраненного файла, который не попал в очередь"""
+    now = time.time()
+    result = json.dumps({"reason": reason})
+    with _connect() as conn:
+        conn.executemany(
+            "INSERT INTO jobs (filename, step, status, result, created_at, updated_at)"
+            " VALUES (?, ?, 'skipped', ?, ?, ?)",
+            [(filename, step, result, now, now) for step in steps_for(filename)],
+        )
+
+
+def _claim_next() -> Optional[tuple]:
+    """Атомарно забирает следующее pending-задание"""
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT id, filename, step FROM jobs WHERE status = 'pending' ORDER BY id LIMIT 1"
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET status = 'processing', updated_at = ? WHERE id = ?",
+                (time.time(), row[0]),
+            )
+        conn.execute("COMMIT")
+    return row
+
+
+def _finish(job_id: int, status: str, result: dict) -> None:
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, updated_at = ? WHERE id = ?",
+            (status, json.dumps(result), time.time(), job_id),
+        )
+
+
+def _requeue(job_id: int) -> None:
+    with _connect() as conn:
+        conn.execute("UPDATE jobs SET status = 'pending' WHERE id = ?", (job_id,))
+
+
+def _requeue_stale() -> None:
+    """После перезапуска возвращает прерванные задания в очередь.
+
+    Рассчитано на одного потребителя очереди: при нескольких процессах приложения
+    (uvicorn --workers) у каждого свой диспетчер, и задания соседа тоже вернутся в очередь.
+    """
+    with _connect() as conn:
+        conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'processing'")
+
+
+def get_file_status(filename: str) -> Optional[dict]:
+    """Сводный статус обработки файла или None, если заданий нет"""
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT step, status, result FROM jobs WHERE filename = ? ORDER BY id",
+            (filename,),
+        ).fetchall()
+    if not rows:
+        return None
+    jobs = [
+        {"step": step, "status": status, "result": json.loads(result) if result else None}
+        for step, status, result in rows
+    ]
+    statuses = {job["status"] for job in jobs}
+    if "failed" in statuses:
+        overall = "failed"
+    elif statuses == {"done"}:
+        overall = "done"
+    elif statuses == {"pending"}:
+        overall = "pending"
+    elif statuses == {"skipped"}:
+        overall = "skipped"
+    else:
+        overall = "processing"
+    return {"filename": filename, "status": overall, "jobs": jobs}
+
+
+# -------- Диспетчер --------
+
+
+class _InlineExecutor(Executor):
+    """Исполнитель без пула (PROCESSING_WORKERS=0): шаги выполняются в потоке диспетчера"""
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def _mp_context(method: str):
+    """Контекст multiprocessing; forkserver есть не везде (Windows) — тогда spawn"""
+    import multiprocessing
+
+    if method == "fork":
+        raise ValueError("PROCESSING_START_METHOD=fork is unsafe in a threaded server")
+    if method not in multiprocessing.get_all_start_methods():
+        method = "spawn"
+    return multiprocessing.get_context(method)
+
+
+class _Dispatcher:
+    def __init__(self, workers: int):
+        self._workers = workers
+        self._executor: Executor
+        if workers > 0:
+            # multiprocessing импортируется только при первом запуске диспетчера
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=_mp_context(PROCESSING_START_METHOD)
+            )
+        else:
+            self._executor = _InlineExecutor()
+        # Ограничиваем число заданий "в полете", остальные ждут в SQLite
+        self._slots = threading.BoundedSemaphore(max(workers, 1) * 2)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="upload-processing", daemon=True)
+
+    def start(self) -> None:
+        _requeue_stale()
+        self._thread.start()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def stop(self) -> None:
+        """Дожидается заданий "в полете"; невзятые остаются в очереди до следующего старта"""
+        self._stopping.set()
+        self._wakeup.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._thread.join(timeout=5.0)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._slots.acquire()
+            if self._stopping.is_set():
+                self._slots.release()
+                return
+            job = _claim_next()
+            if job is None:
+                self._slots.release()
+                self._wakeup.wait(timeout=1.0)
+                self._wakeup.clear()
+                continue
+            job_id, filename, step = job
+            path = str((UPLOAD_DIR / filename).resolve())
+            try:
+                future = self._executor.submit(run_step, step, path)
+            except RuntimeError:
+                # Пул закрыт при завершении интерпретатора: задание вернется в очередь
+                _requeue(job_id)
+                return
+            future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+
+    def _on_done(self, job_id: int, future: Future) -> None:
+        try:
+            _finish(job_id, "done", future.result())
+        except Exception as e:
+            _finish(job_id, "failed", {"error": type(e).__name__})
+        finally:
+            self._slots.release()
+
+
+_dispatcher: Optional[_Dispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def _get_dispatcher() -> _Dispatcher:
+    """Диспетчер запускается при первом обращении"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                dispatcher = _Dispatcher(PROCESSING_WORKERS)
+                dispatcher.start()
+                _dispatcher = dispatcher
+                # Без lifespan (скрипты, тесты) пул закрывается до выгрузки модулей
+                atexit.register(shutdown)
+    return _dispatcher
+
+
+def shutdown() -> None:
+    """Останавливает диспетчер, если он был запущен"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is not None:
+            _dispatcher.stop()
+            _dispatcher = None
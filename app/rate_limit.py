@@ -0,0 +1,200 @@
+"""Движок правил rate limiting (NFR-07).
+
+Каждый запрос проверяется всеми применимыми лимитами (по IP, пользователю, API-ключу).
+Пользователь — принципал проверенного API-ключа: заголовкам, которые клиент выбирает
+сам, доверять нельзя, иначе чужую квоту можно исчерпать с нескольких адресов.
+Лимит — token bucket: ``rate`` токенов в секунду, емкость ``burst``. Стоимость запроса
+зависит от маршрута: дешевый ``GET /features/{id}`` стоит 1 токен, ``/upload`` — больше.
+Стоимости маршрутов компилируются в дерево по сегментам пути, поэтому поиск правила
+не зависит от их количества.
+"""
+
+import hashlib
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.requests import Request
+
+from .security import api_key_principal
+
+
+@dataclass(frozen=True)
+class Limit:
+    name: str
+    key: str  # "ip" | "user" | "api_key"
+    rate: float  # токенов в секунду
+    burst: float  # емкость корзины
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    limit: Optional[Limit] = None  # самый строгий из примененных лимитов
+    remaining: int = 0
+    reset_after: float = 0.0  # секунд до полного восстановления
+    retry_after: float = 0.0
+
+
+def _ip_key(request: Request) -> Optional[str]:
+    return request.client.host if request.client else "unknown"
+
+
+def _user_key(request: Request) -> Optional[str]:
+    api_key = request.headers.get("X-API-Key")
+    return api_key_principal(api_key) if api_key is not None else None
+
+
+def _api_key(request: Request) -> Optional[str]:
+    api_key = request.headers.get("X-API-Key")
+    if api_key is None:
+        return None
+    # Сам ключ в памяти не храним
+    return hashlib.blake2b(api_key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+KEY_FUNCS: Dict[str, Callable[[Request], Optional[str]]] = {
+    "ip": _ip_key,
+    "user": _user_key,
+    "api_key": _api_key,
+}
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    # Как часто (в проверках) удалять простаивающие корзины
+    CLEANUP_EVERY = 10_000
+
+    def __init__(
+        self,
+        limits: Iterable[Limit],
+        route_costs: Dict[Tuple[str, str], int],
+        exempt_paths: Iterable[str] = (),
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.limits: List[Limit] = list(limits)
+        for limit in self.limits:
+            if limit.key not in KEY_FUNCS:
+                raise ValueError(f"unknown rate limit key: {limit.key}")
+        self.exempt_paths = frozenset(exempt_paths)
+        self._clock = clock
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._checks = 0
+        self._routes: Dict[str, dict] = {}
+        for (method, template), cost in route_costs.items():
+            self._compile_route(method, template, cost)
+
+    # -------- Маршруты --------
+
+    def _compile_route(self, method: str, template: str, cost: int) -> None:
+        node = self._routes.setdefault(method.upper(), {})
+        for segment in template.strip("/").split("/"):
+            if segment.startswith("{") and segment.endswith("}"):
+                segment = "*"
+            node = node.setdefault(segment, {})
+        node[None] = cost
+
+    def route_cost(self, method: str, path: str) -> int:
+        """Стоимость запроса; по умолчанию 1"""
+        node = self._routes.get(method)
+        if node is None:
+            return 1
+        for segment in path.strip("/").split("/"):
+            child = node.get(segment)
+            if child is None:
+                child = node.get("*")
+                if child is None:
+                    return 1
+            node = child
+        return node.get(None, 1)
+
+    # -------- Проверка --------
+
+    def check(self, request: Request) -> Optional[Decision]:
+        """Решение по запросу; None для путей без лимитов"""
+        path = request.url.path
+        if path in self.exempt_paths:
+            return None
+        cost = self.route_cost(request.method, path)
+        now = self._clock()
+
+        self._checks += 1
+        if self._checks % self.CLEANUP_EVERY == 0:
+            self._cleanup(now)
+
+        applied = []
+        for limit in self.limits:
+            key = KEY_FUNCS[limit.key](request)
+            if key is None:
+                continue
+            bucket = self._buckets.get((limit.name, key))
+            if bucket is None:
+                bucket = self._buckets[(limit.name, key)] = _Bucket(limit.burst, now)
+            else:
+                elapsed = now - bucket.updated
+                bucket.tokens = min(limit.burst, bucket.tokens + elapsed * limit.rate)
+                bucket.updated = now
+            applied.append((limit, bucket, min(cost, limit.burst)))
+
+        # Сначала проверяем все лимиты, списываем — только если проходят все
+        denied = [(limit, bucket, c) for limit, bucket, c in applied if bucket.tokens < c]
+        if denied:
+            limit, bucket, c = max(denied, key=lambda d: (d[2] - d[1].tokens) / d[0].rate)
+            retry_after = (c - bucket.tokens) / limit.rate
+            return Decision(
+                allowed=False,
+                limit=limit,
+                remaining=int(bucket.tokens),
+                reset_after=(limit.burst - bucket.tokens) / limit.rate,
+                retry_after=retry_after,
+            )
+        for _, bucket, c in applied:
+            bucket.tokens -= c
+        if not applied:
+            return Decision(allowed=True)
+        limit, bucket, _ = min(applied, key=lambda a: a[1].tokens / a[0].burst)
+        return Decision(
+            allowed=True,
+            limit=limit,
+            remaining=int(bucket.tokens),
+            reset_after=(limit.burst - bucket.tokens) / limit.rate,
+        )
+
+    def _cleanup(self, now: float) -> None:
+        """Удаляет корзины, которые уже успели наполниться (клиент давно не приходил)"""
+        limits = {limit.name: limit for limit in self.limits}
+        stale = [
+            key
+            for key, bucket in self._buckets.items()
+            if bucket.tokens + (now - bucket.updated) * limits[key[0]].rate >= limits[key[0]].burst
+        ]
+        for key in stale:
+            del self._buckets[key]
+
+    def reset(self) -> None:
+        self._buckets.clear()
+
+
+def rate_limit_headers(decision: Decision) -> Dict[str, str]:
+    """Заголовки RateLimit-* (draft-ietf-httpapi-ratelimit-headers)"""
+    if decision.limit is None:
+        return {}
+    limit = decision.limit
+    window = max(1, math.ceil(limit.burst / limit.rate))
+    headers = {
+        "RateLimit-Limit": str(int(limit.burst)),
+        "RateLimit-Remaining": str(max(0, decision.remaining)),
+        "RateLimit-Reset": str(math.ceil(decision.reset_after)),
+        "RateLimit-Policy": f'{int(limit.burst)};w={window};name="{limit.name}"',
+    }
+    if not decision.allowed:
+        headers["Retry-After"] = str(max(1, math.ceil(decision.retry_after)))
+    return headers
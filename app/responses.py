@@ -0,0 +1,29 @@
+"""JSON-ответы с быстрым кодировщиком orjson.
+
+orjson закреплен в requirements.txt; запасной путь через stdlib ``json`` оставлен для
+окружений, где пакет не собирается.
+"""
+
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:  # без колеса orjson под платформу — кодируем через stdlib
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Компактный JSON в UTF-8; без orjson — как у JSONResponse"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode(
+        "utf-8"
+    )
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,13 +1,55 @@
 """Утилиты для безопасного кодирования: маскирование PII, валидация и т.д."""
 
+import hashlib
+import ipaddress
 import logging
+import os
 import re
+from typing import Dict, Optional
 
-# Настройка логирования без PII
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def configure_logging() -> None:
+    """Настройка логирования (вызывается при старте приложения, а не при импорте)"""
+    level = os.getenv("LOG_LEVEL", "info").upper()
+    logging.basicConfig(level=getattr(logging, level, logging.INFO))
+
+
+def _api_key_digest(api_key: str) -> bytes:
+    return hashlib.blake2b(api_key.encode("utf-8"), digest_size=32).digest()
+
+
+def parse_api_keys(spec: str) -> Dict[bytes, str]:
+    """Разбирает API_KEYS вида ``principal:key,principal2:key2``; хранятся только хэши ключей"""
+    keys: Dict[bytes, str] = {}
+    for item in spec.split(","):
+        principal, _, api_key = item.strip().partition(":")
+        if principal and api_key:
+            keys[_api_key_digest(api_key)] = principal
+    return keys
+
+
+# Выданные API-ключи: хэш ключа -> принципал
+API_KEYS = parse_api_keys(os.getenv("API_KEYS", ""))
+
+
+def api_key_principal(api_key: str) -> Optional[str]:
+    """Принципал для проверенного API-ключа или None"""
+    return API_KEYS.get(_api_key_digest(api_key))
+
+
+def client_network(host: str) -> str:
+    """Адрес клиента для учета голосов: IPv6 — сеть /64 (клиенту обычно выдается целиком)"""
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return host
+    if address.version == 6:
+        return str(ipaddress.ip_network(f"{address}/64", strict=False))
+    return str(address)
+
+
 def mask_pii(data: str) -> str:
     """Маскирует PII (email, телефон, кредитные карты) в строках"""
     if not isinstance(data, str):
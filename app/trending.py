@@ -0,0 +1,152 @@
+"""Трендовые фичи: голоса с экспоненциальным затуханием.
+
+Вклад голоса уменьшается вдвое каждые ``half_life`` секунд. Чтобы не пересчитывать все
+счетчики со временем, хранится «усиленный» счет: голос в момент ``t`` добавляет
+``value * 2 ** ((t - epoch) / half_life)``. Все счета затухают одинаково, поэтому порядок
+фич от времени не зависит, а обновление при голосе — O(1).
+
+Топ (до ``capacity`` фич с положительным счетом) поддерживается инкрементально. Для фич
+вне топа хранится верхняя граница их счета; полный пересчет нужен только когда счет
+члена топа падает ниже этой границы (например, после голосов -1).
+"""
+
+import heapq
+import math
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+
+# После стольких периодов полураспада счета масштабируются обратно (защита от переполнения)
+_REBASE_AFTER = 512
+# Счета, затухшие ниже этого значения, при масштабировании удаляются
+_NEGLIGIBLE = 1e-6
+
+
+class TrendingIndex:
+    __slots__ = (
+        "half_life",
+        "capacity",
+        "_clock",
+        "_epoch",
+        "_scores",
+        "_top",
+        "_floor",
+        "_outside_max",
+        "_dirty",
+    )
+
+    def __init__(
+        self,
+        half_life: Optional[float] = None,
+        capacity: int = 100,
+        clock: Callable[[], float] = time.time,
+    ):
+        if half_life is None:
+            half_life = TRENDING_HALF_LIFE_HOURS * 3600
+        if half_life <= 0 or capacity < 1:
+            raise ValueError("half_life and capacity must be positive")
+        self.half_life = half_life
+        self.capacity = capacity
+        self._clock = clock
+        self._epoch = clock()
+        self._scores: Dict[int, float] = {}  # feature_id -> усиленный счет
+        self._top: Dict[int, float] = {}  # члены топа (только положительные счета)
+        self._floor: Optional[Tuple[float, int]] = None  # минимум топа (кэш)
+        self._outside_max = 0.0  # верхняя граница счетов вне топа
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _exponent(self, now: float) -> float:
+        return (now - self._epoch) / self.half_life
+
+    def record(self, feature_id: int, value: int, now: Optional[float] = None) -> None:
+        """Учитывает изменение голосов фичи (±1, ±2) в момент now"""
+        if now is None:
+            now = self._clock()
+        exponent = self._exponent(now)
+        if exponent > _REBASE_AFTER:
+            self._rebase(int(exponent))
+            exponent = self._exponent(now)
+        score = self._scores.get(feature_id, 0.0) + value * 2.0**exponent
+        self._scores[feature_id] = score
+
+        top = self._top
+        if feature_id in top:
+            floor = self._floor
+            if score <= 0:
+                del top[feature_id]
+                self._floor = None
+                # Освободилось место: его может занять фича вне топа
+                if self._outside_max > 0:
+                    self._dirty = True
+                return
+            top[feature_id] = score
+            if floor is not None and (floor[1] == feature_id or score < floor[0]):
+                self._floor = None
+            if score < self._outside_max:
+                self._dirty = True
+            return
+
+        if score <= 0:
+            return
+        if len(top) < self.capacity:
+            top[feature_id] = score
+            if self._floor is not None and score < self._floor[0]:
+                self._floor = (score, feature_id)
+            return
+        floor_score, floor_id = self._floor_entry()
+        if score > floor_score:
+            del top[floor_id]
+            top[feature_id] = score
+            self._floor = None
+            self._outside_max = max(self._outside_max, floor_score)
+        else:
+            self._outside_max = max(self._outside_max, score)
+
+    def _floor_entry(self) -> Tuple[float, int]:
+        """Минимальный член топа; пересчитывается за O(capacity) только после изменений"""
+        if self._floor is None:
+            feature_id = min(self._top, key=self._top.__getitem__)
+            self._floor = (self._top[feature_id], feature_id)
+        return self._floor
+
+    def _rebuild(self) -> None:
+        """Полный пересчет топа: O(n log capacity)"""
+        positive = ((score, feature_id) for feature_id, score in self._scores.items() if score > 0)
+        best = heapq.nlargest(self.capacity + 1, positive)
+        self._top = {feature_id: score for score, feature_id in best[: self.capacity]}
+        self._outside_max = best[self.capacity][0] if len(best) > self.capacity else 0.0
+        self._floor = None
+        self._dirty = False
+
+    def _rebase(self, periods: int) -> None:
+        """Сдвигает epoch на periods периодов полураспада, масштабируя все счета"""
+        self._epoch += periods * self.half_life
+        self._scores = {
+            feature_id: scaled
+            for feature_id, score in self._scores.items()
+            if abs(scaled := math.ldexp(score, -periods)) >= _NEGLIGIBLE
+        }
+        self._rebuild()
+
+    def top(self, limit: int, now: Optional[float] = None) -> List[Tuple[int, float]]:
+        """До limit пар (feature_id, текущий счет), по убыванию счета"""
+        if self._dirty:
+            self._rebuild()
+        if now is None:
+            now = self._clock()
+        scale = 2.0 ** -self._exponent(now)
+        best = heapq.nsmallest(
+            min(limit, self.capacity), self._top.items(), key=lambda item: (-item[1], item[0])
+        )
+        return [(feature_id, score * scale) for feature_id, score in best]
+
+    def score(self, feature_id: int, now: Optional[float] = None) -> float:
+        """Текущий (затухший) счет фичи"""
+        if now is None:
+            now = self._clock()
+        return self._scores.get(feature_id, 0.0) * 2.0 ** -self._exponent(now)
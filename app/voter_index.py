@@ -0,0 +1,261 @@
+"""Индекс голосов: один голос на пользователя для каждой фичи.
+
+Идентификаторы голосующих переводятся в плотные целые числа. Для каждой фичи хранятся
+два множества id (голоса +1 и -1): маленькие — обычный ``set``, при росте они
+переносятся в компактный Roaring-подобный битмап (``RoaringBitmap``), где проверка
+членства остается O(1)/O(log 4096), а память — 2 байта на голос или 1 бит на id.
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+_ARRAY_MAX = 4096  # больше — контейнер превращается в битмап на 65536 бит
+_BITMAP_BYTES = 65536 // 8
+
+
+class RoaringBitmap:
+    """Множество 32-битных целых: контейнеры по старшим 16 битам.
+
+    Контейнер — отсортированный ``array('H')`` младших 16 бит (до 4096 элементов)
+    либо ``bytearray`` на 8 КБ с битом на каждое значение.
+    """
+
+    __slots__ = ("_keys", "_containers", "_size")
+
+    def __init__(self, values=()):
+        """values — значения без повторов (множество или список id)"""
+        self._keys: List[int] = []
+        self._containers: List[Union[array, bytearray]] = []
+        values = sorted(values)
+        self._size = len(values)
+        # Пакетная сборка: по контейнеру на каждую группу старших 16 бит
+        start = 0
+        while start < len(values):
+            high = values[start] >> 16
+            stop = bisect_left(values, (high + 1) << 16, start)
+            container = array("H", [v & 0xFFFF for v in values[start:stop]])
+            self._keys.append(high)
+            self._containers.append(
+                container if len(container) <= _ARRAY_MAX else self._to_bitmap(container)
+            )
+            start = stop
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _find(self, high: int) -> Optional[int]:
+        i = bisect_left(self._keys, high)
+        if i < len(self._keys) and self._keys[i] == high:
+            return i
+        return None
+
+    def __contains__(self, value: int) -> bool:
+        i = self._find(value >> 16)
+        if i is None:
+            return False
+        container = self._containers[i]
+        low = value & 0xFFFF
+        if isinstance(container, array):
+            j = bisect_left(container, low)
+            return j < len(container) and container[j] == low
+        return bool(container[low >> 3] & (1 << (low & 7)))
+
+    def add(self, value: int) -> bool:
+        """Добавляет значение; False, если оно уже было"""
+        high, low = value >> 16, value & 0xFFFF
+        i = self._find(high)
+        if i is None:
+            i = bisect_left(self._keys, high)
+            self._keys.insert(i, high)
+            self._containers.insert(i, array("H"))
+        container = self._containers[i]
+        if isinstance(container, array):
+            j = bisect_left(container, low)
+            if j < len(container) and container[j] == low:
+                return False
+            if len(container) < _ARRAY_MAX:
+                container.insert(j, low)
+                self._size += 1
+                return True
+            container = self._containers[i] = self._to_bitmap(container)
+        byte, bit = low >> 3, 1 << (low & 7)
+        if container[byte] & bit:
+            return False
+        container[byte] |= bit
+        self._size += 1
+        return True
+
+    def discard(self, value: int) -> bool:
+        """Удаляет значение; False, если его не было"""
+        i = self._find(value >> 16)
+        if i is None:
+            return False
+        container = self._containers[i]
+        low = value & 0xFFFF
+        if isinstance(container, array):
+            j = bisect_left(container, low)
+            if j == len(container) or container[j] != low:
+                return False
+            del container[j]
+            if not container:
+                del self._keys[i]
+                del self._containers[i]
+        else:
+            byte, bit = low >> 3, 1 << (low & 7)
+            if not container[byte] & bit:
+                return False
+            container[byte] &= ~bit & 0xFF
+        self._size -= 1
+        return True
+
+    def __iter__(self) -> Iterator[int]:
+        for high, container in zip(self._keys, self._containers):
+            base = high << 16
+            if isinstance(container, array):
+                for low in container:
+                    yield base | low
+                continue
+            for byte_index, byte in enumerate(container):
+                while byte:
+                    lowest = byte & -byte
+                    yield base | (byte_index << 3) | (lowest.bit_length() - 1)
+                    byte ^= lowest
+
+    @staticmethod
+    def _to_bitmap(container: array) -> bytearray:
+        bitmap = bytearray(_BITMAP_BYTES)
+        for low in container:
+            bitmap[low >> 3] |= 1 << (low & 7)
+        return bitmap
+
+    def copy(self) -> "RoaringBitmap":
+        clone = RoaringBitmap()
+        clone._keys = list(self._keys)
+        clone._containers = [
+            array("H", c) if isinstance(c, array) else bytearray(c) for c in self._containers
+        ]
+        clone._size = self._size
+        return clone
+
+    def memory_bytes(self) -> int:
+        """Полезный объем контейнеров (без накладных расходов объектов Python)"""
+        total = 0
+        for container in self._containers:
+            total += len(container) * 2 if isinstance(container, array) else _BITMAP_BYTES
+        return total + len(self._keys) * 8
+
+
+VoterSet = Union[set, RoaringBitmap]
+
+
+class VoterIndex:
+    """Кто и как проголосовал за каждую фичу"""
+
+    # Размер, после которого set переносится в RoaringBitmap
+    SPILL_AT = 64
+
+    __slots__ = ("_voter_ids", "_voter_keys", "_ballots", "_generation")
+
+    def __init__(self) -> None:
+        self._voter_ids: Dict[str, int] = {}
+        self._voter_keys: List[str] = []
+        # feature_id -> [голоса +1, голоса -1, поколение]; поколение меняется при снапшоте,
+        # и наборы со старым поколением копируются перед первой записью (copy-on-write)
+        self._ballots: Dict[int, list] = {}
+        self._generation = 0
+
+    @property
+    def voter_count(self) -> int:
+        return len(self._voter_keys)
+
+    def find_voter(self, key: str) -> Optional[int]:
+        """Id уже зарегистрированного голосующего или None"""
+        return self._voter_ids.get(key)
+
+    def voter_id(self, key: str) -> Tuple[int, bool]:
+        """Плотный id голосующего и признак, что он зарегистрирован только что"""
+        voter_id = self._voter_ids.get(key)
+        if voter_id is not None:
+            return voter_id, False
+        voter_id = len(self._voter_keys)
+        self._voter_ids[key] = voter_id
+        self._voter_keys.append(key)
+        return voter_id, True
+
+    def ballot(self, feature_id: int, voter_id: int) -> int:
+        """Текущий голос (+1, -1) или 0, если голоса нет"""
+        sets = self._ballots.get(feature_id)
+        if sets is None:
+            return 0
+        if voter_id in sets[0]:
+            return 1
+        if voter_id in sets[1]:
+            return -1
+        return 0
+
+    def cast(self, feature_id: int, voter_id: int, value: int) -> int:
+        """Учитывает голос и возвращает изменение счетчика фичи (0, ±1 или ±2)"""
+        sets = self._ballots.get(feature_id)
+        if sets is None:
+            sets = self._ballots[feature_id] = [set(), set(), self._generation]
+        elif sets[2] != self._generation:
+            # Наборы разделяются со снапшотом: пишем в копию
+            sets = self._ballots[feature_id] = [sets[0].copy(), sets[1].copy(), self._generation]
+        same, other = (0, 1) if value > 0 else (1, 0)
+        target = sets[same]
+        if isinstance(target, set):
+            if voter_id in target:
+                return 0
+            target.add(voter_id)
+            if len(target) >= self.SPILL_AT:
+                sets[same] = RoaringBitmap(target)
+        elif not target.add(voter_id):
+            return 0
+        previous = sets[other]
+        if previous and voter_id in previous:
+            # Смена голоса: снимаем прежний, счетчик меняется на 2
+            previous.discard(voter_id)
+            return 2 * value
+        return value
+
+    def ballots(self) -> Iterator[Tuple[int, VoterSet, VoterSet]]:
+        """(feature_id, голоса +1, голоса -1) для снапшота"""
+        for feature_id, (up, down, _) in self._ballots.items():
+            yield feature_id, up, down
+
+    def voter_keys(self) -> List[str]:
+        return self._voter_keys
+
+    def restore(self, feature_id: int, up: List[int], down: List[int]) -> None:
+        """Восстанавливает голоса фичи из снапшота"""
+        self._ballots[feature_id] = [
+            *(set(ids) if len(ids) < self.SPILL_AT else RoaringBitmap(ids) for ids in (up, down)),
+            self._generation,
+        ]
+
+    def snapshot(self) -> "VoterSnapshot":
+        """Неизменяемый срез для записи снапшота за O(фич), без копирования голосов.
+
+        Наборы голосов становятся общими со срезом и копируются при следующей записи.
+        """
+        self._generation += 1
+        return VoterSnapshot(self._voter_keys, len(self._voter_keys), dict(self._ballots))
+
+
+class VoterSnapshot:
+    """Состояние VoterIndex на момент снапшота (ключи голосующих только дописываются)"""
+
+    __slots__ = ("_voter_keys", "_voter_count", "_ballots")
+
+    def __init__(self, voter_keys: List[str], voter_count: int, ballots: Dict[int, list]):
+        self._voter_keys = voter_keys
+        self._voter_count = voter_count
+        self._ballots = ballots
+
+    def voter_keys(self) -> List[str]:
+        return self._voter_keys[: self._voter_count]
+
+    def ballots(self) -> Iterator[Tuple[int, VoterSet, VoterSet]]:
+        for feature_id, (up, down, _) in self._ballots.items():
+            yield feature_id, up, down
@@ -2,13 +2,66 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]  # корень репозитория
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 
 def pytest_runtest_setup():
-    """Очистка rate limiter перед каждым тестом"""
-    from app.main import _ip_to_requests
+    """Очистка rate limiter, лимитов нагрузки и кэша фич перед каждым тестом"""
+    from app import features
+    from app.main import concurrency_limiter, rate_limiter
+
+    rate_limiter.reset()
+    concurrency_limiter.reset()
+    features._CACHE.clear()
+
+
+@pytest.fixture
+def api_keys(monkeypatch):
+    """Выданные API-ключи для тестов; возвращает заголовки по имени принципала"""
+    from app import security
+
+    principals = ("alice", "bob", "carol")
+    spec = ",".join(f"{name}:test-key-{name}" for name in principals)
+    monkeypatch.setattr(security, "API_KEYS", security.parse_api_keys(spec))
+    return {name: {"X-API-Key": f"test-key-{name}"} for name in principals}
+
+
+class FakeClock:
+    """Управляемые часы для кода с параметром clock"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def isolated_store(monkeypatch):
+    """Пустое хранилище фич на время теста: id с 1, свои голосующие, тренды и кэш.
+
+    Исходное состояние модуля features восстанавливается, журнал закрывается.
+    """
+    from app import features
+    from app.feature_store import FeatureStore
+    from app.trending import TrendingIndex
+    from app.voter_index import VoterIndex
 
-    _ip_to_requests.clear()
+    monkeypatch.setattr(features, "_STORE", FeatureStore())
+    monkeypatch.setattr(features, "_next_feature_id", 1)
+    monkeypatch.setattr(features, "_VOTERS", VoterIndex())
+    monkeypatch.setattr(features, "_TRENDING", TrendingIndex())
+    features._CACHE.clear()
+    features._CACHE.reset_stats()
+    yield
+    features.disable_persistence()
+    features._CACHE.clear()
@@ -0,0 +1,69 @@
+"""Тесты массового создания фич и пакетной валидации."""
+
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app import features
+from app.batch_validation import validate_feature_batch
+from app.main import app
+from app.models import FeatureCreate
+
+client = TestClient(app)
+
+
+CASES = [
+    {"title": "Search", "description": "Add search bar"},
+    {"title": "  Dark   mode ", "description": " a\tb\n c "},
+    {"title": "", "description": "x"},
+    {"title": "a" * 101, "description": "x"},
+    {"title": "<b>", "description": "x"},
+    {"title": "line\nbreak", "description": "x"},
+    {"title": "nul\x00", "description": "x"},
+    {"title": "ok", "description": ""},
+    {"title": "ok", "description": "a" * 1001},
+    {"title": 5, "description": "x"},
+    {"title": "ok"},
+]
+
+
+def test_batch_validation_matches_model():
+    """Пакетная валидация принимает и нормализует то же, что и FeatureCreate"""
+    valid, errors = validate_feature_batch(CASES)
+    invalid_rows = {e["index"] for e in errors}
+    expected_valid = []
+    for i, row in enumerate(CASES):
+        try:
+            model = FeatureCreate(**row)
+        except ValidationError:
+            assert i in invalid_rows, f"row {i} should be rejected"
+            continue
+        assert i not in invalid_rows, f"row {i} should be accepted"
+        expected_valid.append((model.title, model.description))
+    assert valid == expected_valid
+
+
+def test_bulk_create(isolated_store):
+    rows = [{"title": f"Bulk {i}", "description": "imported"} for i in range(3)]
+    r = client.post("/features/bulk", json=rows)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["created"] == 3
+    r = client.get(f"/features/{data['ids'][-1]}")
+    assert r.json()["title"] == "Bulk 2"
+
+
+def test_bulk_create_reports_row_errors(isolated_store):
+    """Ошибки по строкам в одном ответе RFC 7807, ничего не создается"""
+    before = len(features._STORE)
+    rows = [
+        {"title": "fine", "description": "ok"},
+        {"title": "<script>", "description": "ok"},
+        {"title": "fine", "description": ""},
+    ]
+    r = client.post("/features/bulk", json=rows)
+    assert r.status_code == 422
+    assert r.headers["content-type"].startswith("application/problem+json")
+    body = r.json()
+    assert body["type"].endswith("/problems/validation_error")
+    assert [(e["index"], e["field"]) for e in body["errors"]] == [(1, "title"), (2, "description")]
+    assert len(features._STORE) == before
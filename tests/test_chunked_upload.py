@@ -0,0 +1,193 @@
+"""Тесты возобновляемой загрузки по частям и пакетной загрузки файлов."""
+
+import io
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import chunked_upload, processing
+from app.chunked_upload import delete_session
+from app.main import app
+
+client = TestClient(app)
+
+CHUNK = 1024
+CONTENT = b"".join(b"line %04d of chunked text file\n" % i for i in range(100))
+
+
+@pytest.fixture(autouse=True)
+def sessions_dir(tmp_path, monkeypatch):
+    """Свой каталог сессий на тест: лимиты открытых сессий не зависят от других тестов"""
+    monkeypatch.setattr(chunked_upload, "SESSIONS_DIR", tmp_path)
+    return tmp_path
+
+
+def _create_session(filename="big.txt", size=len(CONTENT), headers=None):
+    r = client.post(
+        "/uploads/sessions",
+        json={"filename": filename, "size": size, "chunk_size": CHUNK},
+        headers=headers,
+    )
+    assert r.status_code == 200
+    return r.json()
+
+
+def _put(upload_id, index, data):
+    return client.put(f"/uploads/sessions/{upload_id}/chunks/{index}", content=data)
+
+
+def test_complete_keeps_session_when_queue_is_full(monkeypatch):
+    """503 при финализации не теряет загруженные чанки: повтор проходит без них"""
+    session = _create_session()
+    upload_id = session["upload_id"]
+    for i in range(session["total_chunks"]):
+        assert _put(upload_id, i, CONTENT[i * CHUNK : (i + 1) * CHUNK]).status_code == 200
+
+    monkeypatch.setattr(processing, "is_full", lambda: True)
+    r = client.post(f"/uploads/sessions/{upload_id}/complete")
+    assert r.status_code == 503
+    assert client.get(f"/uploads/sessions/{upload_id}").json()["complete"] is True
+
+    monkeypatch.setattr(processing, "is_full", lambda: False)
+    r = client.post(f"/uploads/sessions/{upload_id}/complete")
+    assert r.status_code == 200
+    assert r.json()["size"] == len(CONTENT)
+    assert client.get(f"/uploads/sessions/{upload_id}").status_code == 404
+
+
+def test_chunked_upload_out_of_order_and_resume():
+    """Позитивный тест: чанки в произвольном порядке, повтор, статус и сборка"""
+    session = _create_session()
+    upload_id = session["upload_id"]
+    total = session["total_chunks"]
+    assert total == 4
+
+    chunks = [CONTENT[i * CHUNK : (i + 1) * CHUNK] for i in range(total)]
+    assert _put(upload_id, 2, chunks[2]).status_code == 200
+    assert _put(upload_id, 0, chunks[0]).status_code == 200
+    # Повторная отправка идемпотентна
+    assert _put(upload_id, 0, chunks[0]).status_code == 200
+
+    status = client.get(f"/uploads/sessions/{upload_id}").json()
+    assert status["received_ranges"] == [[0, 0], [2, 2]]
+    assert status["complete"] is False
+
+    # Финализация до получения всех чанков запрещена
+    r = client.post(f"/uploads/sessions/{upload_id}/complete")
+    assert r.status_code == 409
+
+    assert _put(upload_id, 1, chunks[1]).status_code == 200
+    assert _put(upload_id, 3, chunks[3]).status_code == 200
+    r = client.post(f"/uploads/sessions/{upload_id}/complete")
+    assert r.status_code == 200
+    data = r.json()
+    assert data["filename"].endswith(".txt")
+    assert data["size"] == len(CONTENT)
+
+    # Сессия удалена после финализации
+    assert client.get(f"/uploads/sessions/{upload_id}").status_code == 404
+
+
+def test_chunked_upload_wrong_chunk_size():
+    """Негативный тест: чанк неверной длины и индекс вне диапазона"""
+    session = _create_session()
+    upload_id = session["upload_id"]
+    assert _put(upload_id, 0, b"short").status_code == 422
+    assert _put(upload_id, 99, b"x" * CHUNK).status_code == 422
+    delete_session(upload_id)
+
+
+def test_chunked_upload_validates_assembled_file():
+    """Негативный тест: собранный файл проходит ту же проверку magic bytes"""
+    fake_png = b"FAKE" * 300
+    session = _create_session(filename="fake.png", size=len(fake_png))
+    upload_id = session["upload_id"]
+    _put(upload_id, 0, fake_png[:CHUNK])
+    _put(upload_id, 1, fake_png[CHUNK:])
+    r = client.post(f"/uploads/sessions/{upload_id}/complete")
+    assert r.status_code == 422
+    # Повтор не исправит невалидный файл — сессия не занимает место до истечения
+    assert client.get(f"/uploads/sessions/{upload_id}").status_code == 404
+
+
+def test_chunked_upload_session_limits():
+    """Негативный тест: запрещенное расширение, превышение размера, неверный id"""
+    r = client.post("/uploads/sessions", json={"filename": "a.exe", "size": 10})
+    assert r.status_code == 422
+    r = client.post("/uploads/sessions", json={"filename": "a.txt", "size": 11 * 1024 * 1024})
+    assert r.status_code == 422
+    assert client.get("/uploads/sessions/..%2F..%2Fetc").status_code == 404
+
+
+def _age(directory, upload_id, seconds):
+    """Сдвигает время последней активности сессии в прошлое"""
+    for path in directory.glob(upload_id + ".*"):
+        mtime = path.stat().st_mtime - seconds
+        os.utime(path, (mtime, mtime))
+
+
+def test_idle_sessions_expire(sessions_dir, monkeypatch):
+    """Сессия истекает по простою: чанк продлевает ее, брошенная удаляется"""
+    ttl = chunked_upload.UPLOAD_SESSION_IDLE_TTL
+    active, idle = _create_session(), _create_session()
+    for session in (active, idle):
+        _age(sessions_dir, session["upload_id"], ttl / 2)
+    assert _put(active["upload_id"], 0, CONTENT[:CHUNK]).status_code == 200
+    status = client.get(f"/uploads/sessions/{active['upload_id']}").json()
+    assert status["expires_at"] >= active["expires_at"]
+
+    later = time.time() + ttl / 2 + 1
+    monkeypatch.setattr(chunked_upload.time, "time", lambda: later)
+    assert client.get(f"/uploads/sessions/{idle['upload_id']}").status_code == 404
+    assert not list(sessions_dir.glob(idle["upload_id"] + ".*"))
+    assert client.get(f"/uploads/sessions/{active['upload_id']}").status_code == 200
+
+
+def test_orphaned_session_files_are_swept(sessions_dir):
+    """Файлы без метаданных (сбой посреди создания) удаляются по простою"""
+    orphan = sessions_dir / ("0" * 32 + ".part")
+    orphan.write_bytes(b"x")
+    os.utime(orphan, (0, 0))
+    fresh = _create_session()
+    assert chunked_upload.sweep_expired() == 1
+    assert sorted(p.stem for p in sessions_dir.iterdir()) == [fresh["upload_id"]] * 3
+
+
+def test_open_sessions_are_capped_per_client(sessions_dir, monkeypatch, api_keys):
+    """Один клиент не может занять все сессии: сверх своего лимита — 429, другим — можно"""
+    monkeypatch.setattr(chunked_upload, "UPLOAD_MAX_SESSIONS_PER_CLIENT", 2)
+    monkeypatch.setattr(chunked_upload, "UPLOAD_MAX_SESSIONS", 3)
+    first = _create_session()
+    _create_session()
+    r = client.post("/uploads/sessions", json={"filename": "c.txt", "size": 10})
+    assert r.status_code == 429
+    assert _create_session(headers=api_keys["alice"])["total_chunks"] == 4
+
+    # Общий предел защищает диск, когда клиентов много
+    r = client.post(
+        "/uploads/sessions", json={"filename": "c.txt", "size": 10}, headers=api_keys["bob"]
+    )
+    assert r.status_code == 503
+    assert r.json()["type"].endswith("/problems/service_unavailable")
+
+    _age(sessions_dir, first["upload_id"], chunked_upload.UPLOAD_SESSION_IDLE_TTL)
+    assert _create_session()["total_chunks"] == 4
+
+
+def test_batch_upload_reports_per_file_results():
+    """Пакетная загрузка: ошибка одного файла не влияет на остальные"""
+    r = client.post(
+        "/upload/batch",
+        files=[
+            ("files", ("a.txt", io.BytesIO(b"first file"), "text/plain")),
+            ("files", ("b.png", io.BytesIO(b"FAKE_PNG_CONTENT"), "image/png")),
+            ("files", ("c.txt", io.BytesIO(b"third file"), "text/plain")),
+        ],
+    )
+    assert r.status_code == 200
+    results = r.json()["files"]
+    assert [res["status"] for res in results] == ["ok", "error", "ok"]
+    assert results[0]["filename"].endswith(".txt")
+    assert "detail" in results[1]
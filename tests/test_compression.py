@@ -0,0 +1,77 @@
+"""Тесты сжатия ответов и быстрого JSON-кодировщика."""
+
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import Response, StreamingResponse
+
+from app.compression import CompressionMiddleware, negotiate_encoding
+from app.main import app
+from app.responses import FastJSONResponse, dumps
+
+client = TestClient(app)
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate", ["br", "gzip"]) == "gzip"
+    assert negotiate_encoding("gzip;q=0.5, br", ["br", "gzip"]) == "br"
+    assert negotiate_encoding("br", ["gzip"]) is None
+    assert negotiate_encoding("gzip;q=0", ["gzip"]) is None
+    assert negotiate_encoding("*", ["br", "gzip"]) == "br"
+    assert negotiate_encoding("identity", ["gzip"]) is None
+
+
+def test_large_list_is_gzipped(isolated_store):
+    for i in range(5):
+        client.post("/features", json={"title": f"Compressed {i}", "description": "x" * 900})
+    r = client.get("/features", headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["Vary"]
+    assert int(r.headers["Content-Length"]) < len(r.content)
+    assert any(item["title"] == "Compressed 4" for item in r.json())
+
+    plain = client.get("/features", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.json() == r.json()
+
+
+def test_small_response_not_compressed():
+    r = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in r.headers
+    assert r.json() == {"status": "ok"}
+
+
+def _tiny_app() -> TestClient:
+    tiny = FastAPI()
+    tiny.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @tiny.get("/stream")
+    def stream():
+        return StreamingResponse((b"line %d\n" % i for i in range(1000)), media_type="text/plain")
+
+    @tiny.get("/image")
+    def image():
+        return Response(b"\x89PNG" + b"\x00" * 1000, media_type="image/png")
+
+    return TestClient(tiny)
+
+
+def test_streaming_and_binary_responses():
+    tiny = _tiny_app()
+    r = tiny.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in r.headers
+    assert r.text == "".join(f"line {i}\n" for i in range(1000))
+
+    r = tiny.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in r.headers
+    assert len(r.content) == 1004
+
+
+def test_fast_json_matches_stdlib():
+    content = {"title": "Тёмная тема", "votes": -3, "items": [1, 2.5, None, True]}
+    expected = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    assert dumps(content) == expected
+    assert FastJSONResponse(content).body == expected
@@ -0,0 +1,91 @@
+"""Тесты адаптивного ограничения одновременных запросов."""
+
+from fastapi.testclient import TestClient
+
+from app.concurrency import AdaptiveLimit, ConcurrencyLimiter
+from app.main import app, concurrency_limiter
+
+client = TestClient(app)
+
+
+def _saturate(limit: AdaptiveLimit) -> None:
+    while limit.try_acquire():
+        pass
+
+
+def test_limit_sheds_above_capacity():
+    limit = AdaptiveLimit("test", initial=2, max_limit=4, target_latency=0.1)
+    assert limit.try_acquire() and limit.try_acquire()
+    assert not limit.try_acquire()
+    assert limit.shed == 1
+    limit.release(0.01)
+    assert limit.try_acquire()
+
+
+def test_additive_increase_only_when_limit_is_used(clock):
+    limit = AdaptiveLimit("test", initial=4, max_limit=8, target_latency=0.1, clock=clock)
+    for _ in range(20):
+        limit.try_acquire()
+        limit.release(0.01)  # один запрос в работе из 4 — лимит не растет
+    assert limit.limit == 4
+
+    for _ in range(10):
+        _saturate(limit)
+        for _ in range(limit.in_flight):
+            limit.release(0.01)
+    assert limit.limit == 8  # не выше max_limit
+
+
+def test_multiplicative_decrease_once_per_period(clock):
+    limit = AdaptiveLimit("test", initial=10, target_latency=0.1, backoff=0.5, clock=clock)
+    _saturate(limit)
+    for _ in range(5):
+        limit.release(1.0)  # пачка медленных ответов — одно уменьшение
+    assert limit.limit == 5
+    clock.now = 0.2
+    limit.release(1.0)
+    assert limit.limit == 2
+    for _ in range(4):
+        clock.now += 1
+        limit.try_acquire()
+        limit.release(1.0)
+    assert limit.limit == 1  # не ниже min_limit
+
+
+def test_route_classes():
+    limiter = ConcurrencyLimiter(
+        [AdaptiveLimit("upload", 1), AdaptiveLimit("default", 1)],
+        {"/upload": "upload"},
+        default="default",
+        exempt_paths={"/health"},
+    )
+    assert limiter.route_limit("/upload").name == "upload"
+    assert limiter.route_limit("/upload/batch").name == "upload"
+    assert limiter.route_limit("/uploads").name == "default"
+    assert limiter.route_limit("/features").name == "default"
+    assert limiter.route_limit("/health") is None
+
+
+def test_overload_returns_503_problem_and_health_stays_up():
+    default = concurrency_limiter.limits["default"]
+    _saturate(default)
+    try:
+        r = client.get("/features", headers={"X-Correlation-ID": "overload-1"})
+        assert r.status_code == 503
+        assert r.headers["Content-Type"] == "application/problem+json"
+        assert int(r.headers["Retry-After"]) >= 1
+        body = r.json()
+        assert body["type"].endswith("/overloaded")
+        assert body["correlation_id"] == "overload-1"
+
+        assert client.get("/health").status_code == 200
+        # Другой класс маршрутов не затронут
+        assert concurrency_limiter.route_limit("/upload").try_acquire()
+        concurrency_limiter.route_limit("/upload").release(0.01)
+    finally:
+        for _ in range(default.in_flight):
+            default.release(0.01)
+
+    stats = client.get("/metrics/concurrency").json()
+    assert stats["default"]["shed"] >= 1
+    assert stats["default"]["in_flight"] == 1  # сам запрос метрик
@@ -0,0 +1,256 @@
+"""Тесты read-through кэша фич."""
+
+import sys
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import features
+from app.cache import (
+    _MISSING,
+    FEATURE_CACHE_REDIS_CONNECT_TIMEOUT,
+    FEATURE_CACHE_REDIS_TIMEOUT,
+    LRUCache,
+    ReadThroughCache,
+    RedisCache,
+)
+from app.main import app
+
+client = TestClient(app)
+
+
+class FakeRedis:
+    """In-process замена клиента redis-py: get / set(px=) / delete"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, name):
+        entry = self.data.get(name)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def set(self, name, value, px=None):
+        self.data[name] = (value, time.monotonic() + px / 1000 if px else float("inf"))
+
+    def delete(self, name):
+        self.data.pop(name, None)
+
+
+def _cache(loader, shared=None, **kwargs):
+    return ReadThroughCache(
+        loader,
+        LRUCache(kwargs.pop("maxsize", 100), kwargs.pop("ttl", 30), **kwargs),
+        shared=shared,
+        encode=str.encode,
+        decode=bytes.decode,
+    )
+
+
+def test_lru_evicts_and_expires(clock):
+    lru = LRUCache(maxsize=2, ttl=10, clock=clock)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1  # "a" становится самым свежим
+    lru.set("c", 3)
+    assert lru.get("b") is _MISSING and len(lru) == 2
+    clock.now = 11
+    assert lru.get("a") is _MISSING and lru.get("c") is _MISSING
+
+
+def test_read_through_and_invalidation():
+    values = {1: "one"}
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        return values.get(key)
+
+    cache = _cache(loader)
+    assert cache.get(1) == "one"
+    assert cache.get(1) == "one"
+    assert cache.get(2) is None and cache.get(2) is None  # отсутствие не кэшируется
+    assert loads == [1, 2, 2]
+
+    values[1] = "uno"
+    cache.invalidate(1)
+    assert cache.get(1) == "uno"
+    stats = cache.stats()
+    assert stats["local_hits"] == 1 and stats["misses"] == 4
+    assert stats["hit_ratio"] == 0.2
+
+
+def test_shared_tier_between_workers():
+    redis = RedisCache(FakeRedis())
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        return f"value-{key}"
+
+    first, second = _cache(loader, shared=redis), _cache(loader, shared=redis)
+    assert first.get(7) == "value-7"
+    assert second.get(7) == "value-7"
+    assert loads == [7]
+    assert second.stats()["shared_hits"] == 1
+
+    second.invalidate(7)  # голос пришел во второй воркер
+    first.local.clear()
+    assert first.get(7) == "value-7"
+    assert loads == [7, 7]
+
+
+def test_concurrent_misses_are_coalesced():
+    release = threading.Event()
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        release.wait(5)
+        return "slow"
+
+    cache = _cache(loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(1))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()["coalesced"] < 19:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert loads == [1]
+    assert results == ["slow"] * 20
+
+
+def test_loader_error_reaches_waiters_and_is_not_cached():
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        if len(calls) == 1:
+            raise RuntimeError("backend down")
+        return "ok"
+
+    cache = _cache(loader)
+    with pytest.raises(RuntimeError):
+        cache.get(1)
+    assert cache.get(1) == "ok"
+
+
+def test_invalidation_during_load_is_not_overwritten():
+    started, release = threading.Event(), threading.Event()
+    version = ["old"]
+
+    def loader(key):
+        value = version[0]
+        started.set()
+        release.wait(5)
+        return value
+
+    cache = _cache(loader)
+    thread = threading.Thread(target=cache.get, args=(1,))
+    thread.start()
+    started.wait(5)
+    version[0] = "new"
+    cache.invalidate(1)
+    release.set()
+    thread.join()
+    assert cache.get(1) == "new"
+
+
+def test_feature_endpoint_uses_cache_and_sees_votes(isolated_store, api_keys):
+    feature = client.post("/features", json={"title": "Cached", "description": "c"}).json()
+    url = f"/features/{feature['id']}"
+    assert client.get(url).json()["votes"] == 0
+    assert client.get(url).json()["votes"] == 0
+    client.post(f"{url}/vote", json={"value": 1}, headers=api_keys["alice"])
+    assert client.get(url).json()["votes"] == 1
+
+    stats = client.get("/metrics/cache").json()["features"]
+    assert stats["local_hits"] >= 1
+    assert stats["misses"] >= 2
+    assert 0 < stats["hit_ratio"] < 1
+
+
+class BrokenRedis:
+    """Общий уровень, который недоступен"""
+
+    def get(self, name):
+        raise ConnectionError("redis down")
+
+    set = delete = get
+
+
+def test_waiters_do_not_block_on_a_hung_load():
+    """Если загрузка лидера зависла, ожидающие по таймауту читают источник сами"""
+    release = threading.Event()
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        if len(calls) == 1:
+            release.wait(5)  # лидер висит, как на Redis без таймаута
+        return f"value-{key}"
+
+    cache = _cache(loader)
+    cache.wait_timeout = 0.05
+    leader = threading.Thread(target=cache.get, args=(1,))
+    leader.start()
+    while not calls:
+        time.sleep(0.001)
+    assert cache.get(1) == "value-1"
+    assert cache.stats()["wait_timeouts"] == 1
+    release.set()
+    leader.join()
+
+
+def test_redis_client_has_timeouts(monkeypatch):
+    """redis-py по умолчанию ждет бесконечно — from_url задает таймауты"""
+    created = {}
+
+    class FakeRedisModule:
+        class Redis:
+            @staticmethod
+            def from_url(url, **kwargs):
+                created.update(kwargs, url=url)
+                return FakeRedis()
+
+    monkeypatch.setitem(sys.modules, "redis", FakeRedisModule)
+    shared = RedisCache.from_url("redis://cache:6379/0")
+    assert created["socket_timeout"] == FEATURE_CACHE_REDIS_TIMEOUT
+    assert created["socket_connect_timeout"] == FEATURE_CACHE_REDIS_CONNECT_TIMEOUT
+    assert 0 < created["socket_timeout"] <= 1
+    shared.set("k", b"v", 1)
+    assert shared.get("k") == b"v"
+
+
+def test_shared_tier_failure_degrades_to_local():
+    cache = _cache(lambda key: f"value-{key}", shared=RedisCache(BrokenRedis()))
+    assert cache.get(1) == "value-1"
+    assert cache.get(1) == "value-1"  # из локального уровня
+    cache.invalidate(1)
+    assert cache.get(1) == "value-1"
+    stats = cache.stats()
+    assert stats["shared_errors"] >= 4
+    assert stats["local_hits"] == 1
+
+
+def test_vote_is_committed_when_shared_tier_is_down(isolated_store, api_keys, monkeypatch):
+    commits = []
+    monkeypatch.setattr(features, "_commit", lambda seq: commits.append(seq))
+    features.set_shared_cache(RedisCache(BrokenRedis()))
+    try:
+        feature = client.post("/features", json={"title": "Redis down", "description": "x"})
+        assert feature.status_code == 200
+        url = f"/features/{feature.json()['id']}"
+        assert client.get(url).json()["votes"] == 0
+        r = client.post(f"{url}/vote", json={"value": 1}, headers=api_keys["bob"])
+        assert r.status_code == 200
+        assert client.get(url).json()["votes"] == 1
+    finally:
+        features.set_shared_cache(None)
+    assert len(commits) == 2  # создание и голос
@@ -36,7 +36,7 @@ def test_vote_feature():
     assert data["votes"] == 1
 
 
-def test_create_second_feature_and_vote():
+def test_create_second_feature_and_vote(api_keys):
     r = client.post(
         "/features",
         json={
@@ -48,9 +48,9 @@ def test_create_second_feature_and_vote():
     data = r.json()
     assert data["id"] == 2
 
-    # Голосуем дважды
-    client.post("/features/2/vote", json={"value": 1})
-    client.post("/features/2/vote", json={"value": 1})
+    # Голосуют два разных пользователя
+    client.post("/features/2/vote", json={"value": 1}, headers=api_keys["alice"])
+    client.post("/features/2/vote", json={"value": 1}, headers=api_keys["bob"])
 
     r2 = client.get("/features/2")
     assert r2.status_code == 200
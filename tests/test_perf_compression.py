@@ -0,0 +1,62 @@
+import json
+import random
+import string
+import time
+
+from fastapi.testclient import TestClient
+
+from app import features, main, responses
+from app.feature_store import FeatureStore
+from app.responses import dumps
+
+client = TestClient(main.app)
+
+CATALOG_SIZES = (1_000, 10_000)
+REQUESTS = 5
+
+
+def _cpu_ms(fn, repeat: int = REQUESTS) -> float:
+    t0 = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - t0) * 1000.0 / repeat
+
+
+def _catalog(size: int) -> FeatureStore:
+    rng = random.Random(size)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(500)]
+    store = FeatureStore()
+    for i in range(1, size + 1):
+        title = " ".join(rng.choices(words, k=3))
+        description = " ".join(rng.choices(words, k=rng.randint(20, 150)))[:1000]
+        store.append(i, title, description, rng.randint(-5, 500))
+    return store
+
+
+def test_features_list_bytes_and_cpu(monkeypatch):
+    monkeypatch.setattr(main.rate_limiter, "exempt_paths", frozenset({"/health", "/features"}))
+    for size in CATALOG_SIZES:
+        monkeypatch.setattr(features, "_STORE", _catalog(size))
+        rows = features.get_all_feature_rows()
+
+        stdlib_ms = _cpu_ms(lambda: json.dumps(rows, ensure_ascii=False, separators=(",", ":")))
+        fast_ms = _cpu_ms(lambda: dumps(rows))
+
+        results = {}
+        for encoding in ("identity", "gzip"):
+            headers = {"Accept-Encoding": encoding}
+            r = client.get("/features", headers=headers)
+            assert r.status_code == 200 and len(r.json()) == size
+            cpu_ms = _cpu_ms(lambda: client.get("/features", headers=headers))
+            results[encoding] = (r.num_bytes_downloaded, cpu_ms)
+
+        (plain_bytes, plain_ms), (gzip_bytes, gzip_ms) = results["identity"], results["gzip"]
+        print(
+            f"perf_metric: features_list_catalog={size} identity_bytes={plain_bytes} "
+            f"gzip_bytes={gzip_bytes} ratio={plain_bytes / gzip_bytes:.2f} "
+            f"identity_cpu_ms={plain_ms:.2f} gzip_cpu_ms={gzip_ms:.2f} "
+            f"json_stdlib_ms={stdlib_ms:.2f} json_fast_ms={fast_ms:.2f} "
+            f"json_encoder={'orjson' if responses.orjson is not None else 'stdlib'}"
+        )
+        assert gzip_bytes * 2 < plain_bytes
+        assert fast_ms <= stdlib_ms * 1.2
@@ -0,0 +1,102 @@
+import random
+import string
+import sys
+import time
+import tracemalloc
+from typing import List, Tuple
+
+from app.feature_store import FeatureStore
+from app.models import Feature
+
+ROWS = 1_000_000  # одинаково для моделей и для колоночного хранилища
+TOP_ROWS = 100_000
+DESCRIPTION_WORDS = (10, 60)  # ~60-400 символов, как у реальных описаний
+
+
+def _texts(count: int) -> List[Tuple[bytes, bytes]]:
+    """Заголовки и описания в байтах: у каждой фичи свои, генерируются один раз"""
+    rng = random.Random(count)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(2000)]
+    return [
+        (
+            f"{' '.join(rng.choices(words, k=3)).capitalize()} #{i}".encode(),
+            " ".join(rng.choices(words, k=rng.randint(*DESCRIPTION_WORDS))).encode(),
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def _rows(texts: List[Tuple[bytes, bytes]]):
+    """Строки фич; decode() дает каждому представлению собственные объекты str"""
+    for i, (title, description) in enumerate(texts, 1):
+        yield i, title.decode(), description.decode(), i % 97
+
+
+def _text_bytes(texts: List[Tuple[bytes, bytes]]) -> int:
+    """Память самих строк заголовков и описаний — одинакова для обоих представлений"""
+    return sum(sys.getsizeof(title) + sys.getsizeof(desc) for _, title, desc, _ in _rows(texts))
+
+
+def _bytes_per_feature(build, texts: List[Tuple[bytes, bytes]]) -> float:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        container = build(texts)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(container) == len(texts)
+    return (after - before) / len(texts)
+
+
+def _build_models(texts: List[Tuple[bytes, bytes]]):
+    return [
+        Feature(id=i, title=title, description=description, votes=votes)
+        for i, title, description, votes in _rows(texts)
+    ]
+
+
+def _build_store(texts: List[Tuple[bytes, bytes]]):
+    store = FeatureStore()
+    store.extend(_rows(texts))
+    return store
+
+
+def test_compact_store_memory_per_feature():
+    texts = _texts(ROWS)
+    payload = _text_bytes(texts) / ROWS
+    model_bytes = _bytes_per_feature(_build_models, texts)
+    store_bytes = _bytes_per_feature(_build_store, texts)
+
+    print(
+        f"perf_metric: feature_rows={ROWS} text_bytes_per_feature={payload:.1f} "
+        f"feature_bytes_model={model_bytes:.1f} feature_bytes_store={store_bytes:.1f} "
+        f"overhead_bytes_model={model_bytes - payload:.1f} "
+        f"overhead_bytes_store={store_bytes - payload:.1f}"
+    )
+
+    assert store_bytes < model_bytes
+    assert store_bytes - payload < (model_bytes - payload) / 4
+
+
+def test_top_features_throughput():
+    texts = _texts(TOP_ROWS)
+    models = _build_models(texts)
+    store = _build_store(texts)
+    iterations = 20
+
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        expected = sorted(models, key=lambda f: f.votes, reverse=True)[:10]
+    model_ms = (time.perf_counter() - t0) * 1000.0 / iterations
+
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        top = store.to_features(store.top_rows(10))
+    store_ms = (time.perf_counter() - t0) * 1000.0 / iterations
+
+    assert [f.id for f in top] == [f.id for f in expected]
+    print(
+        f"perf_metric: top10_rows={TOP_ROWS} model_sort_ms={model_ms:.2f} "
+        f"store_top_ms={store_ms:.2f}"
+    )
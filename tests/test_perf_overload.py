@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+from app import features, main
+from app.concurrency import AdaptiveLimit, ConcurrencyLimiter
+from app.models import Feature
+
+# Имитация бэкенда: 4 соединения, 50 мс на запрос — емкость 80 RPS
+BACKEND_SLOTS = 4
+SERVICE_TIME = 0.05
+CAPACITY_RPS = BACKEND_SLOTS / SERVICE_TIME
+OVERLOAD = 5
+DURATION = 1.5
+
+
+def _slow_backend():
+    slots = threading.Semaphore(BACKEND_SLOTS)
+
+    def get_feature_by_id(feature_id):
+        with slots:
+            time.sleep(SERVICE_TIME)
+        return Feature(id=feature_id, title="Load", description="test", votes=0)
+
+    return get_feature_by_id
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+async def _run_load():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        results, health = [], []
+
+        async def request(at):
+            await asyncio.sleep(max(0.0, at - (time.perf_counter() - t0)))
+            start = time.perf_counter()
+            r = await client.get("/features/1")
+            results.append((r.status_code, time.perf_counter() - start, r))
+
+        async def probe_health():
+            while time.perf_counter() - t0 < DURATION:
+                start = time.perf_counter()
+                r = await client.get("/health")
+                assert r.status_code == 200
+                health.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        rate = CAPACITY_RPS * OVERLOAD
+        t0 = time.perf_counter()
+        await asyncio.gather(
+            probe_health(), *(request(i / rate) for i in range(int(rate * DURATION)))
+        )
+        return results, health, time.perf_counter() - t0
+
+
+def _report(name, results, health, elapsed):
+    ok = [latency for status, latency, _ in results if status == 200]
+    shed = [r for status, _, r in results if status == 503]
+    p99 = _percentile(ok, 0.99)
+    print(
+        f"perf_metric: overload_{name} offered={len(results)} ok={len(ok)} shed={len(shed)} "
+        f"ok_rps={len(ok) / elapsed:.0f} p50_ms={_percentile(ok, 0.5) * 1000:.0f} "
+        f"p99_ms={p99 * 1000:.0f} health_p99_ms={_percentile(health, 0.99) * 1000:.0f} "
+        f"elapsed_s={elapsed:.2f}"
+    )
+    return ok, shed, p99
+
+
+def test_overload_is_shed_and_p99_stays_under_target(monkeypatch):
+    monkeypatch.setattr(features, "get_feature_by_id", _slow_backend())
+    monkeypatch.setattr(main.rate_limiter, "exempt_paths", frozenset({"/health", "/features/1"}))
+
+    adaptive = main.concurrency_limiter
+    # Без ограничения: все запросы встают в очередь к бэкенду
+    unlimited = ConcurrencyLimiter(
+        [AdaptiveLimit("default", initial=10_000, max_limit=10_000)], {}, default="default"
+    )
+    monkeypatch.setattr(main, "concurrency_limiter", unlimited)
+    _, _, baseline_p99 = _report("unlimited", *asyncio.run(_run_load()))
+
+    monkeypatch.setattr(main, "concurrency_limiter", adaptive)
+    ok, shed, p99 = _report("adaptive", *asyncio.run(_run_load()))
+
+    assert shed, "excess load must be shed"
+    assert all(r.headers["Retry-After"] and r.json()["status"] == 503 for r in shed)
+    assert len(ok) >= CAPACITY_RPS * DURATION * 0.5  # полезная работа продолжается
+    assert p99 < 0.4  # NFR-04
+    assert p99 < baseline_p99
@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import features, persistence
+from app.models import FeatureCreate, VoteRequest
+
+VOTES_PER_POLICY = 400
+THREADS = 8
+RECOVERY_OPS = 1_000_000
+RECOVERY_FEATURES = 1_000
+
+
+def test_votes_per_second_by_fsync_policy(tmp_path, isolated_store):
+    rates = {}
+    for policy in persistence.FSYNC_POLICIES:
+        # Пустой каталог журнала — восстановление дает пустое хранилище
+        features.enable_persistence(persistence.FeatureLog(tmp_path / policy, fsync=policy))
+        features.create_feature(FeatureCreate(title="Bench", description="votes"))
+        vote = VoteRequest(value=1)
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=THREADS) as pool:
+            list(
+                pool.map(
+                    lambda i: features.vote_for_feature(1, vote, f"user-{i}"),
+                    range(VOTES_PER_POLICY),
+                )
+            )
+        rates[policy] = VOTES_PER_POLICY / (time.perf_counter() - t0)
+        features.disable_persistence()
+        assert features.get_feature_by_id(1).votes == VOTES_PER_POLICY
+
+    print(
+        "perf_metric: wal_votes_per_sec "
+        + " ".join(f"{policy}={rate:.0f}" for policy, rate in rates.items())
+        + f" threads={THREADS}"
+    )
+
+
+def test_recovery_time_for_1m_operations(tmp_path):
+    records = [
+        persistence.encode_create(i, f"Feature {i}", "recovered from log")
+        for i in range(1, RECOVERY_FEATURES + 1)
+    ]
+    voters = RECOVERY_FEATURES - 1
+    records += [persistence.encode_voter(v, f"user:{v}") for v in range(voters)]
+    ballots = RECOVERY_OPS - RECOVERY_FEATURES - voters
+    records += [
+        persistence.encode_ballot(1 + i % RECOVERY_FEATURES, i // RECOVERY_FEATURES, 1)
+        for i in range(ballots)
+    ]
+    assert len(records) == RECOVERY_OPS
+    (tmp_path / "wal-00000000.log").write_bytes(b"".join(records))
+
+    log = persistence.FeatureLog(tmp_path)
+    t0 = time.perf_counter()
+    next_id, rows, voter_index = log.recover()
+    replay_ms = (time.perf_counter() - t0) * 1000.0
+    log.close()
+    assert next_id == RECOVERY_FEATURES + 1
+    assert sum(row[2] for row in rows.values()) == ballots
+
+    # Тот же объем состояния из снапшота
+    snapshot_log = persistence.FeatureLog(tmp_path / "snap")
+    snapshot_log.recover()
+    snapshot_log.write_snapshot(1, next_id, ((k, *v) for k, v in rows.items()), voter_index)
+    snapshot_log.close()
+    log = persistence.FeatureLog(tmp_path / "snap")
+    t0 = time.perf_counter()
+    _, snapshot_rows, _ = log.recover()
+    snapshot_ms = (time.perf_counter() - t0) * 1000.0
+    log.close()
+    assert snapshot_rows == rows
+
+    print(
+        f"perf_metric: wal_recovery_ops={RECOVERY_OPS} replay_ms={replay_ms:.2f} "
+        f"snapshot_recovery_ms={snapshot_ms:.2f}"
+    )
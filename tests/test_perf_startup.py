@@ -0,0 +1,59 @@
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+_FIRST_HEALTH_SCRIPT = """
+from fastapi.testclient import TestClient
+from app.main import app
+with TestClient(app) as client:
+    assert client.get("/health").status_code == 200
+"""
+
+
+def _importtime(module: str) -> dict:
+    """Кумулятивное время импорта (мкс) модулей по выводу -X importtime"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2))
+    return cumulative
+
+
+def test_import_time_and_cold_start():
+    cumulative = _importtime("app.main")
+    app_main_ms = cumulative["app.main"] / 1000.0
+    own = sorted(
+        ((name, us) for name, us in cumulative.items() if name.startswith("app.")),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    # Тяжелые подсистемы не должны загружаться при импорте приложения
+    assert "concurrent.futures.process" not in cumulative
+    assert "multiprocessing" not in cumulative
+
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", _FIRST_HEALTH_SCRIPT], cwd=ROOT, check=True)
+    first_health_ms = (time.perf_counter() - t0) * 1000.0
+
+    top = " ".join(f"{name}={us / 1000.0:.2f}" for name, us in own[:5])
+    print(
+        f"perf_metric: import_app_main_ms={app_main_ms:.2f} "
+        f"cold_start_first_health_ms={first_health_ms:.2f} top_app_modules_ms=[{top}]"
+    )
+
+    # Generous threshold for local/CI variance
+    assert first_health_ms < 10000.0
@@ -0,0 +1,41 @@
+import random
+import time
+
+from app.trending import TrendingIndex
+
+CATALOG_SIZES = (1_000, 100_000)
+VOTES = 200_000
+QUERIES = 2_000
+
+
+def _measure(catalog: int):
+    rng = random.Random(catalog)
+    now = [0.0]
+    index = TrendingIndex(half_life=3600.0, clock=lambda: now[0])
+    votes = [(rng.randrange(catalog), rng.choice((1, 1, 1, -1))) for _ in range(VOTES)]
+
+    t0 = time.perf_counter()
+    for feature_id, value in votes:
+        now[0] += 0.01
+        index.record(feature_id, value)
+    record_ns = (time.perf_counter() - t0) * 1e9 / VOTES
+
+    # Запросы вперемешку с голосами, как под реальной нагрузкой
+    t0 = time.perf_counter()
+    for i in range(QUERIES):
+        index.record(*votes[i])
+        index.top(10)
+    query_us = (time.perf_counter() - t0) * 1e6 / QUERIES
+    return record_ns, query_us
+
+
+def test_trending_query_independent_of_catalog():
+    results = {size: _measure(size) for size in CATALOG_SIZES}
+    small, large = (results[size][1] for size in CATALOG_SIZES)
+    for size, (record_ns, query_us) in results.items():
+        print(
+            f"perf_metric: trending_catalog={size} record_ns={record_ns:.0f} "
+            f"query_us={query_us:.1f}"
+        )
+    # В 100 раз больше фич — время запроса почти то же (полный пересчет дал бы x100)
+    assert large < small * 5
@@ -0,0 +1,73 @@
+import random
+import sys
+import time
+import tracemalloc
+
+from app.voter_index import VoterIndex
+
+VOTERS = 1_000_000
+FEATURES = 10
+BALLOT_SHARE = (0.3, 0.01)  # доля голосующих у популярной и у обычной фичи
+LOOKUPS = 200_000
+
+
+def _set_bytes(ids) -> int:
+    """Память обычного set[int]: таблица + объекты int"""
+    as_set = set(ids)
+    return sys.getsizeof(as_set) + sum(sys.getsizeof(v) for v in as_set)
+
+
+def _register_voters(index: VoterIndex) -> int:
+    """Регистрирует голосующих с ключами как в API и возвращает память таблицы ключей"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(VOTERS):
+        key = f"ip:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" if i % 4 else f"key:user-{i}"
+        index.voter_id(key)
+    key_table = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return key_table
+
+
+def test_voter_index_memory_and_lookup_at_scale():
+    rng = random.Random(7)
+    index = VoterIndex()
+    key_table_bytes = _register_voters(index)
+
+    # Голоса — случайные подмножества зарегистрированных id, а не плотный диапазон
+    ballots = set_bytes = 0
+    for feature_id in range(1, FEATURES + 1):
+        share = BALLOT_SHARE[0] if feature_id == 1 else BALLOT_SHARE[1]
+        ids = rng.sample(range(VOTERS), int(VOTERS * share))
+        index.restore(feature_id, ids, [])
+        ballots += len(ids)
+        set_bytes += _set_bytes(ids)
+    bitmap_bytes = sum(
+        up.memory_bytes() if hasattr(up, "memory_bytes") else _set_bytes(up)
+        for _, up, _ in index.ballots()
+    )
+
+    probes = [(rng.randrange(1, FEATURES + 1), rng.randrange(VOTERS)) for _ in range(LOOKUPS)]
+    t0 = time.perf_counter()
+    hits = sum(1 for feature_id, voter in probes if index.ballot(feature_id, voter))
+    lookup_ns = (time.perf_counter() - t0) * 1e9 / LOOKUPS
+
+    new_ballots = sum(1 for probe in set(probes) if not index.ballot(*probe))
+    t0 = time.perf_counter()
+    deltas = sum(index.cast(feature_id, voter, 1) for feature_id, voter in probes)
+    cast_ns = (time.perf_counter() - t0) * 1e9 / LOOKUPS
+
+    assert deltas == new_ballots and hits
+    print(
+        f"perf_metric: voter_index_voters={VOTERS} ballots={ballots} "
+        f"key_table_bytes_per_voter={key_table_bytes / VOTERS:.1f} "
+        f"bitmap_bytes_per_ballot={bitmap_bytes / ballots:.3f} "
+        f"set_bytes_per_ballot={set_bytes / ballots:.1f} "
+        f"total_mb={(key_table_bytes + bitmap_bytes) / 2**20:.1f} "
+        f"total_with_sets_mb={(key_table_bytes + set_bytes) / 2**20:.1f} "
+        f"lookup_ns={lookup_ns:.0f} cast_ns={cast_ns:.0f}"
+    )
+
+    assert bitmap_bytes < set_bytes / 10
+    # Таблица ключей не зависит от представления голосов и ограничена FEATURES_MAX_VOTERS
+    assert key_table_bytes / VOTERS < 200
@@ -0,0 +1,76 @@
+"""Тесты журнала упреждающей записи и снапшотов хранилища фич."""
+
+import time
+
+import pytest
+
+from app import features, persistence
+from app.feature_store import FeatureStore
+from app.models import FeatureCreate, VoteRequest
+from app.voter_index import VoterIndex
+
+
+def _restart(directory, **kwargs):
+    """Имитация перезапуска: память очищается, состояние берется с диска"""
+    features.disable_persistence()
+    features._STORE = FeatureStore()
+    features._next_feature_id = 1
+    features._VOTERS = VoterIndex()
+    features.enable_persistence(persistence.FeatureLog(directory, **kwargs))
+
+
+@pytest.mark.parametrize("policy", persistence.FSYNC_POLICIES)
+def test_recovery_replays_log(tmp_path, isolated_store, policy):
+    features.enable_persistence(persistence.FeatureLog(tmp_path, fsync=policy))
+    features.create_feature(FeatureCreate(title="Search", description="Search bar"))
+    features.create_features_bulk([("Dark mode", "Theme"), ("Export", "CSV export")])
+    features.vote_for_feature(1, VoteRequest(value=1), "alice")
+    features.vote_for_feature(3, VoteRequest(value=-1), "alice")
+    features.vote_for_feature(1, VoteRequest(value=1), "bob")
+
+    _restart(tmp_path, fsync=policy)
+    recovered = [(f.id, f.title, f.votes) for f in features.get_all_features()]
+    assert recovered == [(1, "Search", 2), (2, "Dark mode", 0), (3, "Export", -1)]
+    # Индекс голосующих тоже восстановлен: повтор не учитывается, смена — учитывается
+    assert features.vote_for_feature(1, VoteRequest(value=1), "bob").votes == 2
+    assert features.vote_for_feature(3, VoteRequest(value=1), "alice").votes == 1
+    assert features.create_feature(FeatureCreate(title="Next", description="x")).id == 4
+
+
+def test_torn_tail_is_discarded(tmp_path, isolated_store):
+    features.enable_persistence(persistence.FeatureLog(tmp_path))
+    features.create_feature(FeatureCreate(title="Search", description="Search bar"))
+    features.vote_for_feature(1, VoteRequest(value=1), "alice")
+    features.disable_persistence()
+
+    # Падение посреди записи: половина записи голоса
+    (wal,) = tmp_path.glob("wal-*.log")
+    with open(wal, "ab") as f:
+        f.write(persistence.encode_ballot(1, 0, -1)[:7])
+
+    _restart(tmp_path)
+    assert features.get_feature_by_id(1).votes == 1
+    features.vote_for_feature(1, VoteRequest(value=1), "bob")
+    _restart(tmp_path)
+    assert features.get_feature_by_id(1).votes == 2
+
+
+def test_snapshot_compacts_log(tmp_path, isolated_store):
+    log = persistence.FeatureLog(tmp_path, snapshot_every=5)
+    features.enable_persistence(log)
+    features.create_features_bulk([(f"F{i}", "d") for i in range(3)])
+    for voter in ("alice", "bob", "carol"):
+        features.vote_for_feature(2, VoteRequest(value=1), voter)
+    # Снапшот пишется в фоне
+    for _ in range(100):
+        if not features._snapshot_running and list(tmp_path.glob("snapshot-*.bin")):
+            break
+        time.sleep(0.01)
+    assert [p.name for p in tmp_path.glob("snapshot-*.bin")] == ["snapshot-00000001.bin"]
+    assert not (tmp_path / "wal-00000000.log").exists()
+
+    features.vote_for_feature(2, VoteRequest(value=1), "dave")
+    _restart(tmp_path)
+    assert [(f.id, f.votes) for f in features.get_all_features()] == [(1, 0), (2, 4), (3, 0)]
+    # Голоса из снапшота: повтор не учитывается
+    assert features.vote_for_feature(2, VoteRequest(value=1), "alice").votes == 4
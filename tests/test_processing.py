@@ -0,0 +1,91 @@
+"""Тесты фоновой обработки загруженных файлов."""
+
+import hashlib
+import io
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import processing
+from app.main import app
+
+client = TestClient(app)
+
+PNG_CONTENT = (
+    b"\x89PNG\r\n\x1a\n"
+    b"\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x02\x00\x00\x00\x90wS\xde"
+    b"\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xdb\x00\x00\x00\x00IEND\xaeB`\x82"
+)
+
+
+def _wait_done(filename: str, timeout: float = 15.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        r = client.get(f"/upload/{filename}/status")
+        assert r.status_code == 200
+        status = r.json()
+        if status["status"] in ("done", "failed") or time.monotonic() > deadline:
+            return status
+        time.sleep(0.2)
+
+
+def test_upload_is_processed_in_background():
+    """Загрузка возвращается сразу, шаги обработки выполняются в фоне"""
+    r = client.post("/upload", files={"file": ("img.png", io.BytesIO(PNG_CONTENT), "image/png")})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["processing"] == "queued"
+
+    status = _wait_done(data["filename"])
+    assert status["status"] == "done"
+    results = {job["step"]: job["result"] for job in status["jobs"]}
+    assert results["checksum"]["sha256"] == hashlib.sha256(PNG_CONTENT).hexdigest()
+    assert results["scan"]["infected"] is False
+    assert results["image_info"] == {"width": 1, "height": 1}
+
+
+def test_worker_pool_does_not_fork():
+    """Пул создается из многопоточного процесса — воркеры запускаются без fork"""
+    dispatcher = processing._get_dispatcher()
+    if processing.PROCESSING_WORKERS > 0:
+        method = dispatcher._executor._mp_context.get_start_method()
+        assert method in ("forkserver", "spawn")
+    assert processing._mp_context("no-such-method").get_start_method() == "spawn"
+    with pytest.raises(ValueError):
+        processing._mp_context("fork")
+
+
+def test_upload_status_unknown_file():
+    r = client.get("/upload/0123456789abcdef0123456789abcdef.txt/status")
+    assert r.status_code == 404
+
+
+def test_upload_rejected_when_queue_full(monkeypatch):
+    """Переполненная очередь: 503 без сохранения файла"""
+    monkeypatch.setattr(processing, "MAX_QUEUE_SIZE", 0)
+    r = client.post("/upload", files={"file": ("a.txt", io.BytesIO(b"hello"), "text/plain")})
+    assert r.status_code == 503
+    assert r.json()["type"].endswith("/problems/service_unavailable")
+
+
+def test_queue_full_after_save_records_skipped_status(monkeypatch):
+    """Очередь заполнилась между проверкой и постановкой: у файла есть конечный статус"""
+
+    def full(filename):
+        raise processing.QueueFullError("processing queue is full")
+
+    monkeypatch.setattr(processing, "enqueue_file", full)
+    r = client.post("/upload", files={"file": ("b.txt", io.BytesIO(b"hello"), "text/plain")})
+    assert r.status_code == 200
+    assert r.json()["processing"] == "skipped"
+
+    status = client.get(f"/upload/{r.json()['filename']}/status").json()
+    assert status["status"] == "skipped"
+    assert all(job["result"] == {"reason": "processing queue is full"} for job in status["jobs"])
+
+
+def test_pdf_pages_step(tmp_path):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 /Type /Pages /Type /Page /Type/Page")
+    assert processing.step_pdf_pages(str(pdf)) == {"pages": 2}
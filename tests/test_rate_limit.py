@@ -19,3 +19,94 @@ def test_rate_limit_returns_429_when_exceeded():
             break
 
     assert hit_429, "Expected at least one 429 when exceeding 10 RPS limit"
+
+
+def test_rate_limit_headers_exposed():
+    r = client.get("/features")
+    assert r.status_code == 200
+    assert r.headers["RateLimit-Limit"] == "10"
+    assert r.headers["RateLimit-Remaining"] == "9"
+    assert "RateLimit-Reset" in r.headers
+    assert client.get("/health").headers.get("RateLimit-Limit") is None
+
+
+def _request(method="GET", path="/features", ip="10.0.0.1", headers=()):
+    from starlette.requests import Request
+
+    return Request(
+        {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "query_string": b"",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+            "client": (ip, 1234),
+        }
+    )
+
+
+def _limiter(clock):
+    from app.rate_limit import Limit, RateLimiter
+
+    return RateLimiter(
+        [
+            Limit(name="ip", key="ip", rate=10, burst=10),
+            Limit(name="user", key="user", rate=2, burst=4),
+            Limit(name="api_key", key="api_key", rate=5, burst=5),
+        ],
+        {("POST", "/upload"): 5, ("POST", "/features/{feature_id}/vote"): 2},
+        exempt_paths={"/health"},
+        clock=clock,
+    )
+
+
+def test_route_costs_compiled(clock):
+    limiter = _limiter(clock)
+    assert limiter.route_cost("POST", "/upload") == 5
+    assert limiter.route_cost("POST", "/features/42/vote") == 2
+    assert limiter.route_cost("GET", "/features/42") == 1
+    assert limiter.route_cost("POST", "/features/42/other") == 1
+
+
+def test_weighted_cost_and_refill(clock):
+    limiter = _limiter(clock)
+    assert limiter.check(_request("POST", "/upload")).allowed
+    assert limiter.check(_request("POST", "/upload")).allowed
+    denied = limiter.check(_request("POST", "/upload"))
+    assert not denied.allowed
+    assert denied.limit.name == "ip"
+    assert denied.retry_after == 0.5
+    clock.now = 0.5
+    assert limiter.check(_request("POST", "/upload")).allowed
+    assert limiter.check(_request(path="/health")) is None
+
+
+def test_user_limit_independent_of_ip(clock, api_keys):
+    limiter = _limiter(clock)
+    user = list(api_keys["alice"].items())
+    for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4"):
+        assert limiter.check(_request(ip=ip, headers=user)).allowed
+    denied = limiter.check(_request(ip="10.0.0.5", headers=user))
+    assert not denied.allowed and denied.limit.name == "user"
+    # Отказ не списывает токены с других корзин
+    decision = limiter.check(_request(ip="10.0.0.5"))
+    assert decision.allowed and decision.remaining == 9
+
+
+def test_user_limit_ignores_client_chosen_identity(clock, api_keys):
+    """X-User-ID и непроверенный ключ не тратят квоту принципала"""
+    limiter = _limiter(clock)
+    for i in range(10):
+        spoofed = [("X-User-ID", "alice"), ("X-API-Key", f"forged-{i}")]
+        assert limiter.check(_request(ip=f"10.0.2.{i}", headers=spoofed)).allowed
+    assert all(name != "user" for name, _ in limiter._buckets)
+    assert limiter.check(_request(headers=list(api_keys["alice"].items()))).allowed
+
+
+def test_api_key_limit(clock):
+    limiter = _limiter(clock)
+    key = [("X-API-Key", "secret-key")]
+    for i in range(5):
+        assert limiter.check(_request(ip=f"10.0.1.{i}", headers=key)).allowed
+    assert limiter.check(_request(ip="10.0.1.9", headers=key)).limit.name == "api_key"
+    assert all("secret-key" not in bucket_key[1] for bucket_key in limiter._buckets)
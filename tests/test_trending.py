@@ -0,0 +1,79 @@
+"""Тесты трендового рейтинга с затуханием голосов."""
+
+import random
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.trending import TrendingIndex
+
+client = TestClient(app)
+
+HOUR = 3600.0
+
+
+def test_recent_votes_outrank_old_ones(clock):
+    index = TrendingIndex(half_life=HOUR, clock=clock)
+    for _ in range(4):
+        index.record(1, 1)
+    clock.now += 3 * HOUR  # 4 старых голоса весят как 0.5
+    index.record(2, 1)
+
+    top = index.top(5)
+    assert [feature_id for feature_id, _ in top] == [2, 1]
+    assert top[0][1] == 1.0
+    assert abs(top[1][1] - 0.5) < 1e-9
+
+
+def test_negative_scores_not_listed(clock):
+    index = TrendingIndex(half_life=HOUR, clock=clock)
+    index.record(1, 1)
+    index.record(2, -1)
+    index.record(1, -2)  # смена голоса +1 -> -1
+    assert index.top(5) == []
+
+
+def test_incremental_top_matches_full_recount(clock):
+    index = TrendingIndex(half_life=HOUR, capacity=10, clock=clock)
+    rng = random.Random(34)
+    for _ in range(5000):
+        clock.now += rng.random() * 60
+        index.record(rng.randrange(200), rng.choice((1, 1, 1, -1, 2, -2)))
+        if rng.random() < 0.05:
+            expected = sorted(
+                (
+                    (feature_id, index.score(feature_id))
+                    for feature_id in range(200)
+                    if index.score(feature_id) > 0
+                ),
+                key=lambda item: (-item[1], item[0]),
+            )[:10]
+            actual = index.top(10)
+            assert [round(s, 9) for _, s in actual] == [round(s, 9) for _, s in expected]
+
+
+def test_rebase_keeps_ranking(clock):
+    index = TrendingIndex(half_life=1.0, clock=clock)
+    index.record(1, 2)
+    index.record(2, 1)
+    clock.now += 600  # больше порога масштабирования: старые счета затухают до нуля
+    index.record(3, 1)
+    index.record(2, 2)
+    assert index.top(5) == [(2, 2.0), (3, 1.0)]
+    assert len(index) == 2
+
+
+def test_trending_endpoint(isolated_store, api_keys):
+    a = client.post("/features", json={"title": "Trending A", "description": "a"}).json()
+    b = client.post("/features", json={"title": "Trending B", "description": "b"}).json()
+    for user in ("alice", "bob"):
+        client.post(f"/features/{b['id']}/vote", json={"value": 1}, headers=api_keys[user])
+    client.post(f"/features/{a['id']}/vote", json={"value": 1}, headers=api_keys["alice"])
+
+    r = client.get("/features/trending", params={"limit": 5})
+    assert r.status_code == 200
+    assert [item["id"] for item in r.json()] == [b["id"], a["id"]]
+    item = r.json()[0]
+    assert item["votes"] == 2 and 1.9 < item["score"] <= 2.0
+
+    assert client.get("/features/trending", params={"limit": 0}).status_code == 422
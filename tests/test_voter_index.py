@@ -0,0 +1,117 @@
+"""Тесты дедупликации голосов и индекса голосующих."""
+
+import random
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.voter_index import RoaringBitmap, VoterIndex
+
+client = TestClient(app)
+
+
+def test_roaring_bitmap_matches_set():
+    rng = random.Random(42)
+    bitmap, expected = RoaringBitmap(), set()
+    # Плотный диапазон (контейнер становится битмапом) и разреженные значения
+    values = [rng.randrange(6000) for _ in range(8000)] + [rng.randrange(2**32) for _ in range(500)]
+    for value in values:
+        assert bitmap.add(value) == (value not in expected)
+        expected.add(value)
+    for value in values[::3]:
+        assert bitmap.discard(value) == (value in expected)
+        expected.discard(value)
+    assert len(bitmap) == len(expected)
+    assert list(bitmap) == sorted(expected)
+    assert all(v in bitmap for v in expected)
+    # Пакетная сборка и копия дают то же множество
+    assert list(RoaringBitmap(expected)) == sorted(expected)
+    assert list(bitmap.copy()) == sorted(expected)
+
+
+def test_voter_index_deltas():
+    index = VoterIndex()
+    alice, _ = index.voter_id("alice")
+    assert index.voter_id("alice") == (alice, False)
+    assert index.cast(1, alice, 1) == 1
+    assert index.cast(1, alice, 1) == 0
+    assert index.cast(1, alice, -1) == -2
+    assert index.ballot(1, alice) == -1
+    assert index.cast(2, alice, 1) == 1
+
+
+def test_voter_index_spills_to_bitmap():
+    index = VoterIndex()
+    for voter in range(VoterIndex.SPILL_AT * 3):
+        assert index.cast(1, voter, 1) == 1
+    assert isinstance(index._ballots[1][0], RoaringBitmap)
+    assert index.cast(1, 5, 1) == 0
+    assert index.cast(1, 5, -1) == -2
+
+
+def test_snapshot_is_copy_on_write():
+    index = VoterIndex()
+    for voter in range(VoterIndex.SPILL_AT * 2):
+        index.cast(1, index.voter_id(f"v{voter}")[0], 1)
+    index.cast(2, 0, -1)
+    snapshot = index.snapshot()
+    up_before = index._ballots[1][0]
+
+    index.cast(1, index.voter_id("late")[0], 1)
+    index.cast(2, 0, 1)
+    # Срез не видит изменений после него, индекс пишет в копии наборов
+    ballots = {feature_id: (list(up), list(down)) for feature_id, up, down in snapshot.ballots()}
+    assert len(ballots[1][0]) == VoterIndex.SPILL_AT * 2
+    assert ballots[2] == ([], [0])
+    assert "late" not in snapshot.voter_keys()
+    assert index._ballots[1][0] is not up_before
+    assert index.ballot(2, 0) == 1
+
+
+def test_vote_once_per_api_key(api_keys):
+    r = client.post("/features", json={"title": "Dedup", "description": "One vote per user"})
+    feature_id = r.json()["id"]
+    url = f"/features/{feature_id}/vote"
+
+    assert client.post(url, json={"value": 1}, headers=api_keys["carol"]).json()["votes"] == 1
+    # Повторный голос не учитывается
+    assert client.post(url, json={"value": 1}, headers=api_keys["carol"]).json()["votes"] == 1
+    # Смена голоса применяется разницей
+    assert client.post(url, json={"value": -1}, headers=api_keys["carol"]).json()["votes"] == -1
+    # Без ключа голосующий определяется по адресу клиента
+    assert client.post(url, json={"value": 1}).json()["votes"] == 0
+
+
+def test_client_chosen_headers_do_not_add_votes():
+    r = client.post("/features", json={"title": "Sockpuppets", "description": "x"})
+    url = f"/features/{r.json()['id']}/vote"
+    for i in range(5):
+        r = client.post(url, json={"value": 1}, headers={"X-User-ID": f"sock{i}"})
+    assert r.json()["votes"] == 1
+
+    r = client.post(url, json={"value": 1}, headers={"X-API-Key": "forged"})
+    assert r.status_code == 401
+    assert r.json()["title"] == "Unauthorized"
+
+
+def test_voter_capacity(monkeypatch, api_keys):
+    from app import features
+
+    r = client.post("/features", json={"title": "Capacity", "description": "x"})
+    url = f"/features/{r.json()['id']}/vote"
+    monkeypatch.setattr(features, "_VOTERS", VoterIndex())
+    monkeypatch.setattr(features, "MAX_VOTERS", 1)
+    assert client.post(url, json={"value": 1}, headers=api_keys["alice"]).status_code == 200
+    r = client.post(url, json={"value": 1}, headers=api_keys["bob"])
+    assert r.status_code == 503
+    # Уже известный голосующий может менять голос
+    r = client.post(url, json={"value": -1}, headers=api_keys["alice"])
+    assert r.status_code == 200 and r.json()["votes"] == -1
+
+
+def test_ipv6_clients_grouped_by_network():
+    from app.security import client_network
+
+    assert client_network("2001:db8:1:2:aaaa::1") == client_network("2001:db8:1:2:bbbb::2")
+    assert client_network("2001:db8:1:3::1") != client_network("2001:db8:1:2::1")
+    assert client_network("203.0.113.7") == "203.0.113.7"